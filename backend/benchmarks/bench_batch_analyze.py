@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+EmotionAnalyzer.batch_analyze 基准
+
+对同一组文本分别用 batch_analyze 和逐条 analyze()（asyncio.gather）评分，输出耗时与每条文本的平均耗时；
+计时前先确认两条路径生成的响应字典逐条一致
+
+用法：
+    python backend/benchmarks/bench_batch_analyze.py --texts 500 --model-latency-ms 20 --output batch.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+import _bootstrap
+from _bootstrap import StubAudioProcessor, StubFusionEngine, StubTextProcessor, StubVisualProcessor, load_service
+
+analyzer_module = load_service("models.emotion_analyzer")
+
+
+def _contexts(count: int):
+    """部分条目带上下文，覆盖推理片段中的上下文分支"""
+    return [{"previous_messages": ["你好"] * (i % 3)} if i % 2 else None for i in range(count)]
+
+
+async def _timed(coro_factory, rounds: int) -> Dict[str, Any]:
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await coro_factory()
+        durations.append(time.perf_counter() - started)
+    return {"best_s": round(min(durations), 4), "mean_s": round(sum(durations) / rounds, 4)}
+
+
+async def run(args) -> Dict[str, Any]:
+    _bootstrap.setup_logging()
+    _bootstrap.set_model_latency(text=args.model_latency_ms / 1000)
+    analyzer = analyzer_module.EmotionAnalyzer(
+        text_processor=StubTextProcessor(),
+        audio_processor=StubAudioProcessor(),
+        visual_processor=StubVisualProcessor(),
+        fusion_engine=StubFusionEngine(),
+    )
+    texts = [f"第{i}条夜间重新评分的记录，今天{'开心' if i % 3 else '疲惫'}" for i in range(args.texts)]
+    contexts = _contexts(args.texts)
+
+    async def per_item():
+        return await asyncio.gather(*[
+            analyzer.analyze(text=text, context=context) for text, context in zip(texts, contexts)
+        ])
+
+    async def batched():
+        return await analyzer.batch_analyze(texts, contexts)
+
+    single_results = await per_item()
+    batch_results = await batched()
+    for i, (single, batch) in enumerate(zip(single_results, batch_results)):
+        if single.to_dict() != batch.to_dict():
+            raise SystemExit(f"第{i}条文本的批量结果与analyze()不一致")
+
+    per_item_timing = await _timed(per_item, args.rounds)
+    batch_timing = await _timed(batched, args.rounds)
+    return {
+        "texts": args.texts,
+        "model_latency_ms": args.model_latency_ms,
+        "per_item_analyze": per_item_timing,
+        "batch_analyze": batch_timing,
+        "speedup": round(per_item_timing["best_s"] / batch_timing["best_s"], 2) if batch_timing["best_s"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmotionAnalyzer.batch_analyze 基准")
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="文本模型替身每次调用的模拟耗时")
+    parser.add_argument("--output", help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+情感服务端点负载基准
+
+以确定性替身启动 main.py 中的FastAPI应用（进程内ASGI调用，不经过网络），
+按给定并发依次压测 /analyze、/chat、/navigate、/status，输出吞吐量与p50/p95/p99延迟；
+可与保存的基线结果对比
+
+用法：
+    python backend/benchmarks/bench_endpoints.py --concurrency 32 --requests 2000 --output current.json
+    python backend/benchmarks/bench_endpoints.py --enable batching,result_cache --baseline current.json
+    python backend/benchmarks/bench_endpoints.py --env EMOTION_BATCH_MAX_SIZE=64 --model-latency-ms 5
+    python backend/benchmarks/bench_endpoints.py --endpoints analyze --audio-kb 64 \
+        --env EMOTION_OFFLOAD_WORKERS=2 --env EMOTION_OFFLOAD_START_METHOD=fork
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+import _bootstrap
+
+ENDPOINTS = ("analyze", "chat", "navigate", "status")
+
+_WORDS = (
+    "今天", "工作", "考试", "朋友", "家人", "下雨", "加班", "旅行", "失眠", "散步",
+    "开心", "难过", "紧张", "期待", "孤单", "生气", "平静", "担心", "感激", "疲惫",
+)
+
+
+def _build_texts(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) for _ in range(count)]
+
+
+def _make_payloads(args) -> Dict[str, Callable[[int], Dict[str, Any]]]:
+    """每个端点按请求序号生成确定性的请求"""
+    texts = _build_texts(args.distinct_texts, args.seed)
+    emotions = _bootstrap.EMOTIONS
+    # 与前端一致，音频以base64字符串放在请求上下文中
+    analyze_context = {}
+    if args.audio_kb > 0:
+        audio = random.Random(args.seed).randbytes(int(args.audio_kb * 1024))
+        analyze_context["audio_data"] = base64.b64encode(audio).decode("ascii")
+
+    def user(i):
+        return f"bench-user-{i % args.users}"
+
+    return {
+        "analyze": lambda i: {
+            "method": "POST", "url": "/analyze",
+            "json": {"text": texts[i % len(texts)], "userId": user(i), "context": analyze_context},
+        },
+        "chat": lambda i: {
+            "method": "POST", "url": "/chat",
+            "json": {"message": texts[i % len(texts)], "userId": user(i), "sessionId": f"s-{i % args.users}"},
+        },
+        "navigate": lambda i: {
+            "method": "POST", "url": "/navigate",
+            "json": {
+                "currentEmotion": emotions[i % len(emotions)],
+                "targetEmotion": emotions[(i * 7 + 3) % len(emotions)],
+                "preferences": {},
+            },
+        },
+        "status": lambda i: {
+            "method": "GET", "url": "/status",
+            "params": {"userId": user(i), "timeframe": ("day", "week", "month")[i % 3]},
+        },
+    }
+
+
+async def _run_phase(client, make_request, requests: int, concurrency: int) -> Dict[str, Any]:
+    """以固定并发发送请求，返回延迟分布与状态码统计"""
+    latencies = np.zeros(requests, dtype=np.float64)
+    status_codes: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            started = time.perf_counter()
+            response = await client.request(**make_request(i))
+            latencies[i] = time.perf_counter() - started
+            code = str(response.status_code)
+            status_codes[code] = status_codes.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    ms = latencies * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": requests,
+        "errors": sum(n for code, n in status_codes.items() if not code.startswith("2")),
+        "status_codes": status_codes,
+        "duration_s": round(duration, 4),
+        "throughput_rps": round(requests / duration, 2),
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "mean": round(float(ms.mean()), 3),
+            "max": round(float(ms.max()), 3),
+        },
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    import httpx
+
+    _bootstrap.set_model_latency(text=args.model_latency_ms / 1000, gpt=args.gpt_latency_ms / 1000)
+    main = _bootstrap.load_service("main", _bootstrap.SERVICE_STUB_MODULES)
+    payloads = _make_payloads(args)
+
+    results: Dict[str, Any] = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for endpoint in args.endpoints:
+                make_request = payloads[endpoint]
+                if args.warmup:
+                    await _run_phase(client, make_request, args.warmup, args.concurrency)
+                results[endpoint] = await _run_phase(client, make_request, args.requests, args.concurrency)
+            stats = (await client.get("/stats")).json()
+
+    return {"endpoints": results, "service_stats": stats}
+
+
+def check_offload(args, report: Dict[str, Any]):
+    """携带音频且启用进程池时，确认base64音频确实交给了工作进程"""
+    if args.audio_kb <= 0 or "analyze" not in args.endpoints:
+        return
+    if int(report["config"]["env"].get("EMOTION_OFFLOAD_WORKERS", "0")) <= 0:
+        return
+    pool = report["service_stats"].get("offload_pool") or {}
+    expected = args.requests + args.warmup
+    if pool.get("completed", 0) < expected:
+        raise SystemExit(f"进程池只处理了 {pool.get('completed', 0)}/{expected} 个音频请求")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    与基线逐端点对比
+
+    吞吐量下降或p95/p99延迟上升超过tolerance（百分比）时标记为回归
+    """
+    def change(new, old):
+        return round((new - old) / old * 100, 2) if old else None
+
+    comparison = {}
+    for endpoint, result in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if base is None:
+            continue
+        entry = {"throughput_rps_pct": change(result["throughput_rps"], base["throughput_rps"])}
+        for name in ("p50", "p95", "p99"):
+            entry[f"{name}_pct"] = change(result["latency_ms"][name], base["latency_ms"][name])
+        entry["regression"] = any([
+            entry["throughput_rps_pct"] is not None and entry["throughput_rps_pct"] < -tolerance,
+            entry["p95_pct"] is not None and entry["p95_pct"] > tolerance,
+            entry["p99_pct"] is not None and entry["p99_pct"] > tolerance,
+        ])
+        comparison[endpoint] = entry
+    return comparison
+
+
+def _parse_env(args) -> Dict[str, str]:
+    env = {}
+    for name in args.enable.split(",") if args.enable else []:
+        env[f"EMOTION_{name.strip().upper()}_ENABLED"] = "true"
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--env 需要 KEY=VALUE 格式: {item}")
+        env[key] = value
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情感服务端点负载基准")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help="逗号分隔的端点列表（analyze,chat,navigate,status）")
+    parser.add_argument("--requests", type=int, default=2000, help="每个端点的请求数")
+    parser.add_argument("--warmup", type=int, default=200, help="每个端点正式计时前的预热请求数")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=200, help="模拟的用户数")
+    parser.add_argument("--distinct-texts", type=int, default=1000, help="不同文本的数量（影响结果缓存命中率）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="文本模型替身的模拟耗时")
+    parser.add_argument("--audio-kb", type=float, default=0.0,
+                        help="/analyze请求携带的base64音频大小（KB），0表示不携带")
+    parser.add_argument("--gpt-latency-ms", type=float, default=0.0, help="EmotionGPT替身的模拟耗时")
+    parser.add_argument("--enable", default="", help="逗号分隔的功能开关，如 batching,result_cache")
+    parser.add_argument("--env", action="append", default=[], help="额外的环境变量 KEY=VALUE，可重复")
+    parser.add_argument("--output", help="结果JSON文件路径")
+    parser.add_argument("--baseline", help="用于对比的基线结果JSON文件")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="判定回归的变化百分比")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以非零状态退出")
+    args = parser.parse_args()
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"未知端点: {', '.join(sorted(unknown))}")
+
+    # 功能开关在main.py导入时读取，必须先写入环境变量
+    env = _parse_env(args)
+    os.environ.update(env)
+
+    report = {
+        "config": {
+            "endpoints": args.endpoints,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "distinct_texts": args.distinct_texts,
+            "seed": args.seed,
+            "model_latency_ms": args.model_latency_ms,
+            "gpt_latency_ms": args.gpt_latency_ms,
+            "audio_kb": args.audio_kb,
+            "env": env,
+            "python": platform.python_version(),
+        },
+        **asyncio.run(run_benchmark(args)),
+    }
+    check_offload(args, report)
+
+    regression = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = compare(report, baseline, args.tolerance)
+        regression = any(entry["regression"] for entry in report["comparison"].values())
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if regression and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
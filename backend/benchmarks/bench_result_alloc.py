@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+EmotionResult内存分配基准
+
+用tracemalloc统计每个请求构建分析结果时的分配字节数和分配块数，
+新的EmotionResult与原先的dataclass表示（构建时即生成元数据、次要情感和推理字符串）分别测量：
+- hot_path：只构建结果（缓存、流水线、时间线等只读取情感ID和数值的路径）
+- serialized：构建结果并生成响应字典（/analyze每个请求都会经过的路径）
+
+两种表示在同一组融合结果上生成的响应字典完全一致
+
+用法：
+    python backend/benchmarks/bench_result_alloc.py --requests 5000 --output alloc.json
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from _bootstrap import StubAudioProcessor, StubFusionEngine, StubTextProcessor, StubVisualProcessor, load_service
+
+analyzer_module = load_service("models.emotion_analyzer")
+
+
+@dataclass
+class _DataclassEmotionResult:
+    """原先的结果表示，作为对照"""
+    emotion: str
+    intensity: float
+    confidence: float
+    reasoning: str
+    secondary_emotions: Optional[List[Dict[str, Any]]] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def _dataclass_build(analyzer, fusion_result, text, context, user_id):
+    """按原先的方式在构建时生成全部字典和字符串"""
+    secondary = [
+        {
+            "emotion": item.get("emotion"),
+            "intensity": item.get("intensity", 0.0),
+            "confidence": item.get("confidence", 0.0),
+        }
+        for item in fusion_result.get("secondary_emotions", [])
+    ]
+    metadata = {
+        "text_length": len(text),
+        "has_context": context is not None,
+        "user_id": user_id,
+        "analysis_timestamp": "2024-01-01T00:00:00Z",
+        "model_version": analyzer.model_version,
+    }
+    reasoning = "；".join(analyzer._generate_detailed_reasoning(fusion_result, text, context))
+    return _DataclassEmotionResult(
+        emotion=fusion_result.get("emotion", "neutral"),
+        intensity=fusion_result.get("intensity", 0.5),
+        confidence=fusion_result.get("confidence", 0.5),
+        reasoning=reasoning,
+        secondary_emotions=secondary,
+        metadata=metadata,
+    )
+
+
+def _measure(build, requests: int) -> Dict[str, float]:
+    """保留全部结果，统计每个请求的净分配字节数和块数"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = [build(i) for i in range(requests)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del results
+    return {
+        "bytes_per_request": round(size / requests, 1),
+        "blocks_per_request": round(blocks / requests, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmotionResult内存分配基准")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--output", help="结果JSON文件路径")
+    args = parser.parse_args()
+
+    analyzer = analyzer_module.EmotionAnalyzer(
+        text_processor=StubTextProcessor(),
+        audio_processor=StubAudioProcessor(),
+        visual_processor=StubVisualProcessor(),
+        fusion_engine=StubFusionEngine(),
+    )
+
+    texts = [f"今天的心情第{i}次记录" for i in range(256)]
+    text_results = [StubTextProcessor._analyze(text) for text in texts]
+    # 与真实融合引擎一样直接给出次要情感列表，两种表示走相同的分支
+    fusion_results = [
+        dict(
+            result,
+            text_analysis=result,
+            reasoning="融合文本模态",
+            secondary_emotions=[
+                {"emotion": emotion, "intensity": score * result["intensity"], "confidence": score}
+                for emotion, score in result["emotion_scores"].items()
+                if emotion != result["emotion"]
+            ],
+        )
+        for result in text_results
+    ]
+    context = {"previous_messages": ["你好"]}
+
+    def build(i):
+        j = i % len(texts)
+        return analyzer._build_final_result(fusion_results[j], texts[j], context, f"user-{j}")
+
+    def build_dataclass(i):
+        j = i % len(texts)
+        return _dataclass_build(analyzer, fusion_results[j], texts[j], context, f"user-{j}")
+
+    for i in range(len(texts)):
+        if build(i).to_dict() != dataclasses.asdict(build_dataclass(i)):
+            raise SystemExit(f"第{i}条结果的两种表示序列化后不一致")
+
+    report = {
+        "requests": args.requests,
+        "emotion_result": {
+            "hot_path": _measure(build, args.requests),
+            "serialized": _measure(lambda i: build(i).to_dict(), args.requests),
+        },
+        "dataclass_baseline": {
+            "hot_path": _measure(build_dataclass, args.requests),
+            "serialized": _measure(lambda i: dataclasses.asdict(build_dataclass(i)), args.requests),
+        },
+    }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,21 +4,25 @@ Aurora情感分析服务
 """
 
 import asyncio
+import json
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 import structlog
 
 from .models.emotion_analyzer import EmotionAnalyzer
 from .models.emotion_gpt import EmotionGPT
 from .models.emotion_navigator import EmotionNavigator
+from .models.emotion_graph import EmotionTransitionGraph
 from .services.text_processor import TextProcessor
 from .services.audio_processor import AudioProcessor
 from .services.visual_processor import VisualProcessor
@@ -26,6 +30,22 @@ from .services.fusion_engine import FusionEngine
 from .utils.logger import setup_logging
 from .utils.database import DatabaseManager
 from .utils.cache import CacheManager
+from .utils.batch_scheduler import MicroBatchScheduler
+from .utils.result_cache import EmotionResultCache
+from .utils.process_pool import ModalityProcessPool
+from .utils.chat_pipeline import SpeculativeChatPipeline
+from .utils.write_behind import WriteBehindBuffer
+from .utils.model_loader import ModelLoader
+from .utils.admission import AdmissionController, AdmissionRejected
+from .utils.emotion_rollups import EmotionRollupStore
+from .utils.emotion_timeline import EmotionTimelineStore
+from .utils.fast_json import BACKEND as FAST_JSON_BACKEND, FastJSONResponse
+from .utils.metrics import (
+    PrometheusMiddleware,
+    observe_stage,
+    record_model_load_timings,
+    render_metrics
+)
 
 # 配置日志
 setup_logging()
@@ -41,6 +61,82 @@ visual_processor: Optional[VisualProcessor] = None
 fusion_engine: Optional[FusionEngine] = None
 db_manager: Optional[DatabaseManager] = None
 cache_manager: Optional[CacheManager] = None
+batch_scheduler: Optional[MicroBatchScheduler] = None
+result_cache: Optional[EmotionResultCache] = None
+offload_pool: Optional[ModalityProcessPool] = None
+chat_pipeline: Optional[SpeculativeChatPipeline] = None
+analysis_writer: Optional[WriteBehindBuffer] = None
+chat_writer: Optional[WriteBehindBuffer] = None
+model_loader: Optional[ModelLoader] = None
+admission_controller: Optional[AdmissionController] = None
+emotion_rollups: Optional[EmotionRollupStore] = None
+rollups_refresher: Optional[asyncio.Task] = None
+emotion_timeline: Optional[EmotionTimelineStore] = None
+emotion_graph: Optional[EmotionTransitionGraph] = None
+
+# 微批调度配置
+BATCHING_ENABLED = os.getenv("EMOTION_BATCHING_ENABLED", "false").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("EMOTION_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMOTION_BATCH_MAX_WAIT_MS", "5"))
+
+# 各模态分析截止时间（秒）
+MODALITY_TIMEOUTS = {
+    "text": float(os.getenv("EMOTION_TEXT_TIMEOUT", "5")),
+    "audio": float(os.getenv("EMOTION_AUDIO_TIMEOUT", "3")),
+    "visual": float(os.getenv("EMOTION_VISUAL_TIMEOUT", "3")),
+}
+
+# 音频/视觉模型延迟到首次请求时加载
+LAZY_MODALITIES = os.getenv("EMOTION_LAZY_MODALITIES", "false").lower() == "true"
+
+# 音视频处理进程池大小，0表示在事件循环所在进程内处理
+OFFLOAD_WORKERS = int(os.getenv("EMOTION_OFFLOAD_WORKERS", "0"))
+OFFLOAD_START_METHOD = os.getenv("EMOTION_OFFLOAD_START_METHOD", "spawn")
+
+# 对话流水线：情感分析与回复生成重叠执行
+CHAT_PIPELINE_ENABLED = os.getenv("EMOTION_CHAT_PIPELINE_ENABLED", "false").lower() == "true"
+
+# 分析/对话记录的批量写回配置
+WRITE_BEHIND_ENABLED = os.getenv("EMOTION_WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("EMOTION_WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv("EMOTION_WRITE_BEHIND_INTERVAL_MS", "1000"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("EMOTION_WRITE_BEHIND_MAX_PENDING", "20000"))
+
+# 结果缓存配置
+RESULT_CACHE_ENABLED = os.getenv("EMOTION_RESULT_CACHE_ENABLED", "false").lower() == "true"
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("EMOTION_RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("EMOTION_RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_REMOTE_TTL = int(os.getenv("EMOTION_RESULT_CACHE_REMOTE_TTL", "3600"))
+
+# 准入控制配置：用户级令牌桶（每秒补充速率/桶容量）+ 全局并发上限与等待队列
+ADMISSION_ENABLED = os.getenv("EMOTION_ADMISSION_ENABLED", "false").lower() == "true"
+ADMISSION_USER_RATE = float(os.getenv("EMOTION_ADMISSION_USER_RATE", "2"))
+ADMISSION_USER_BURST = int(os.getenv("EMOTION_ADMISSION_USER_BURST", "10"))
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("EMOTION_ADMISSION_MAX_CONCURRENCY", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("EMOTION_ADMISSION_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("EMOTION_ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+
+# 情感汇总配置：保存分析结果时增量更新，/status优先从汇总读取
+ROLLUPS_ENABLED = os.getenv("EMOTION_ROLLUPS_ENABLED", "false").lower() == "true"
+ROLLUPS_MAX_USERS = int(os.getenv("EMOTION_ROLLUPS_MAX_USERS", "100000"))
+# 启动时读取保留期内的数据库记录构建汇总，之后每隔该秒数只读取新增记录（纳入其他副本写入的记录），0表示只在启动时读取
+ROLLUPS_REFRESH_SECONDS = float(os.getenv("EMOTION_ROLLUPS_REFRESH_SECONDS", "300"))
+
+# 用户情感时间线配置：每用户环形缓冲长度、用户数与内存上限、上下文分析的时间窗口（秒）
+TIMELINE_ENABLED = os.getenv("EMOTION_TIMELINE_ENABLED", "false").lower() == "true"
+TIMELINE_CAPACITY = int(os.getenv("EMOTION_TIMELINE_CAPACITY", "128"))
+TIMELINE_MAX_USERS = int(os.getenv("EMOTION_TIMELINE_MAX_USERS", "100000"))
+TIMELINE_MAX_MB = int(os.getenv("EMOTION_TIMELINE_MAX_MB", "64"))
+TIMELINE_WINDOW = float(os.getenv("EMOTION_TIMELINE_WINDOW", "86400"))
+
+# 快速JSON响应：/analyze、/chat直接把内部结果编码为字节，跳过response_model校验（响应结构与OpenAPI文档不变）；
+# /navigate的结果来自导航模型，仍按响应模型校验一次后再直接编码
+FAST_JSON_ENABLED = os.getenv("EMOTION_FAST_JSON_ENABLED", "false").lower() == "true"
+
+# 情感转移图配置：启动时预计算全部情感对的导航路径，/navigate查表，图中没有的情感回退到导航模型
+# 启用后路径中的练习与建议来自转移图内置的模板，不再由导航模型生成
+NAVIGATION_GRAPH_ENABLED = os.getenv("EMOTION_NAVIGATION_GRAPH_ENABLED", "false").lower() == "true"
+NAVIGATION_GRAPH_CACHE_SIZE = int(os.getenv("EMOTION_NAVIGATION_GRAPH_CACHE_SIZE", "4096"))
 
 
 @asynccontextmanager
@@ -48,60 +144,162 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     global emotion_analyzer, emotion_gpt, emotion_navigator
     global text_processor, audio_processor, visual_processor, fusion_engine
-    global db_manager, cache_manager
+    global db_manager, cache_manager, batch_scheduler, result_cache, offload_pool
+    global chat_pipeline, analysis_writer, chat_writer, model_loader, admission_controller
+    global emotion_rollups, rollups_refresher, emotion_timeline, emotion_graph
     
     logger.info("🚀 启动Aurora情感分析服务...")
     
     try:
-        # 初始化数据库连接
+        # 并行初始化数据库连接和缓存
         db_manager = DatabaseManager()
-        await db_manager.connect()
-        logger.info("✅ 数据库连接成功")
-        
-        # 初始化缓存
         cache_manager = CacheManager()
-        await cache_manager.connect()
-        logger.info("✅ 缓存连接成功")
+        await asyncio.gather(db_manager.connect(), cache_manager.connect())
+        logger.info("✅ 数据库与缓存连接成功")
         
-        # 初始化文本处理器
-        text_processor = TextProcessor()
-        await text_processor.load_models()
-        logger.info("✅ 文本处理器初始化完成")
+        # 初始化批量写回缓冲
+        if WRITE_BEHIND_ENABLED:
+            analysis_writer = WriteBehindBuffer(
+                "emotion_analyses",
+                _flush_analysis_records,
+                max_batch_size=WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=WRITE_BEHIND_INTERVAL_MS / 1000,
+                max_pending=WRITE_BEHIND_MAX_PENDING
+            )
+            chat_writer = WriteBehindBuffer(
+                "chat_messages",
+                _flush_chat_records,
+                max_batch_size=WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=WRITE_BEHIND_INTERVAL_MS / 1000,
+                max_pending=WRITE_BEHIND_MAX_PENDING
+            )
+            await analysis_writer.start()
+            await chat_writer.start()
+            # 批量插入由数据库管理器提供，缺少时每次刷写退化为逐条插入
+            missing_bulk = [
+                name for name in ("save_emotion_analyses_bulk", "save_chat_records_bulk")
+                if not hasattr(db_manager, name)
+            ]
+            if missing_bulk:
+                logger.warning("数据库管理器不支持批量写入，批量写回将逐条插入", methods=missing_bulk)
+            logger.info("✅ 批量写回缓冲初始化完成")
         
-        # 初始化音频处理器
+        # 创建各模型组件，统一交给模型加载器管理
+        text_processor = TextProcessor()
         audio_processor = AudioProcessor()
-        await audio_processor.load_models()
-        logger.info("✅ 音频处理器初始化完成")
-        
-        # 初始化视觉处理器
         visual_processor = VisualProcessor()
-        await visual_processor.load_models()
-        logger.info("✅ 视觉处理器初始化完成")
-        
-        # 初始化融合引擎
         fusion_engine = FusionEngine()
-        await fusion_engine.initialize()
-        logger.info("✅ 融合引擎初始化完成")
+        emotion_gpt = EmotionGPT()
+        emotion_navigator = EmotionNavigator()
+        
+        # 启用进程池时音视频模型由工作进程加载，主进程仅在回退时按需加载
+        lazy_modalities = LAZY_MODALITIES or OFFLOAD_WORKERS > 0
+        model_loader = ModelLoader()
+        model_loader.register("text", text_processor.load_models)
+        model_loader.register("fusion", fusion_engine.initialize)
+        model_loader.register("audio", audio_processor.load_models, lazy=lazy_modalities)
+        model_loader.register("visual", visual_processor.load_models, lazy=lazy_modalities)
+        model_loader.register("emotion_gpt", emotion_gpt.load_models)
+        model_loader.register("emotion_navigator", emotion_navigator.load_models)
+        
+        if OFFLOAD_WORKERS > 0:
+            offload_pool = ModalityProcessPool(
+                {"audio": AudioProcessor, "visual": VisualProcessor},
+                max_workers=OFFLOAD_WORKERS,
+                start_method=OFFLOAD_START_METHOD
+            )
+        
+        # 并行加载所有非延迟模型，同时预热音视频处理进程池（每个工作进程各自加载一次模型）
+        await asyncio.gather(
+            model_loader.load_eager(),
+            *([offload_pool.start()] if offload_pool else [])
+        )
+        logger.info("✅ 模型加载完成", 
+                   models=model_loader.status(),
+                   loadSeconds={name: round(t, 3) for name, t in model_loader.timings.items()})
         
-        # 初始化情感分析器
+        # 初始化情感分析器（与服务共享加载器，不会重复加载模型）
         emotion_analyzer = EmotionAnalyzer(
             text_processor=text_processor,
             audio_processor=audio_processor,
             visual_processor=visual_processor,
-            fusion_engine=fusion_engine
+            fusion_engine=fusion_engine,
+            modality_timeouts=MODALITY_TIMEOUTS,
+            offload_pool=offload_pool,
+            model_loader=model_loader
         )
-        await emotion_analyzer.load_models()
         logger.info("✅ 情感分析器初始化完成")
         
-        # 初始化情感GPT
-        emotion_gpt = EmotionGPT()
-        await emotion_gpt.load_models()
-        logger.info("✅ 情感GPT初始化完成")
+        # 初始化用户情感时间线（使用分析器的情感类别编码）
+        if TIMELINE_ENABLED:
+            emotion_timeline = EmotionTimelineStore(
+                emotion_analyzer.emotion_labels,
+                capacity_per_user=TIMELINE_CAPACITY,
+                max_users=TIMELINE_MAX_USERS,
+                max_bytes=TIMELINE_MAX_MB * 1024 * 1024
+            )
+            emotion_analyzer.timeline = emotion_timeline
+            emotion_analyzer.history_window = TIMELINE_WINDOW
+            logger.info("✅ 情感时间线初始化完成", maxUsers=emotion_timeline.max_users)
         
-        # 初始化情感导航器
-        emotion_navigator = EmotionNavigator()
-        await emotion_navigator.load_models()
-        logger.info("✅ 情感导航器初始化完成")
+        # 初始化微批调度器
+        if BATCHING_ENABLED:
+            batch_scheduler = MicroBatchScheduler(
+                emotion_analyzer,
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait_ms=BATCH_MAX_WAIT_MS
+            )
+            await batch_scheduler.start()
+            logger.info("✅ 微批调度器初始化完成")
+        
+        # 初始化结果缓存
+        if RESULT_CACHE_ENABLED:
+            result_cache = EmotionResultCache(
+                cache_manager=cache_manager,
+                model_version=emotion_analyzer.model_version,
+                max_entries=RESULT_CACHE_MAX_ENTRIES,
+                ttl_seconds=RESULT_CACHE_TTL,
+                remote_ttl_seconds=RESULT_CACHE_REMOTE_TTL
+            )
+            logger.info("✅ 结果缓存初始化完成")
+        
+        # 初始化对话流水线
+        if CHAT_PIPELINE_ENABLED:
+            chat_pipeline = SpeculativeChatPipeline(
+                known_emotions=emotion_analyzer.emotion_mapping,
+                intensity_level=emotion_analyzer.get_emotion_intensity_level
+            )
+            logger.info("✅ 对话流水线初始化完成")
+        
+        # 初始化准入控制
+        if ADMISSION_ENABLED:
+            admission_controller = AdmissionController(
+                user_rate=ADMISSION_USER_RATE,
+                user_burst=ADMISSION_USER_BURST,
+                max_concurrency=ADMISSION_MAX_CONCURRENCY,
+                max_queue=ADMISSION_MAX_QUEUE,
+                queue_timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000
+            )
+            logger.info("✅ 准入控制初始化完成")
+        
+        # 初始化情感汇总
+        if ROLLUPS_ENABLED:
+            emotion_rollups = EmotionRollupStore(max_users=ROLLUPS_MAX_USERS)
+            try:
+                seeded = await refresh_emotion_rollups()
+            except Exception as e:
+                seeded = False
+                logger.error("从数据库更新情感汇总失败", error=str(e))
+            if seeded and ROLLUPS_REFRESH_SECONDS > 0:
+                rollups_refresher = asyncio.create_task(_refresh_rollups_periodically())
+            logger.info("✅ 情感汇总初始化完成", seeded=seeded)
+        
+        if NAVIGATION_GRAPH_ENABLED:
+            emotion_graph = EmotionTransitionGraph(cache_size=NAVIGATION_GRAPH_CACHE_SIZE)
+            logger.info("✅ 情感转移图初始化完成", routes=emotion_graph.get_stats()["routes"])
+        
+        if FAST_JSON_ENABLED:
+            logger.info("✅ 快速JSON响应已启用", backend=FAST_JSON_BACKEND)
         
         logger.info("🎉 Aurora情感分析服务启动完成!")
         
@@ -114,6 +312,17 @@ async def lifespan(app: FastAPI):
     # 清理资源
     logger.info("🔄 正在关闭Aurora情感分析服务...")
     
+    if rollups_refresher:
+        rollups_refresher.cancel()
+    if batch_scheduler:
+        await batch_scheduler.stop()
+    if offload_pool:
+        await offload_pool.shutdown()
+    # 数据库断开前把缓冲中的记录全部写出
+    if analysis_writer:
+        await analysis_writer.close()
+    if chat_writer:
+        await chat_writer.close()
     if db_manager:
         await db_manager.disconnect()
     if cache_manager:
@@ -139,7 +348,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """跳过流式端点的gzip压缩，避免压缩缓冲延迟事件推送"""
+    
+    def __init__(self, app, exclude_paths=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(
+    PrometheusMiddleware,
+    tracked_paths=(
+        "/analyze", "/chat", "/chat/stream", "/navigate",
+        "/status", "/health", "/ready", "/stats"
+    ),
+    excluded_paths=("/metrics",)
+)
+
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1000,
+    exclude_paths=("/chat/stream",)
+)
 
 
 # Pydantic模型定义
@@ -212,6 +448,63 @@ async def get_emotion_navigator():
     return emotion_navigator
 
 
+async def acquire_admission(user_id: Optional[str]) -> float:
+    """申请准入，被拒绝时以429/503和Retry-After响应；返回获准时刻"""
+    if admission_controller is not None:
+        try:
+            await admission_controller.acquire(user_id)
+        except AdmissionRejected as e:
+            detail = "请求过于频繁，请稍后重试" if e.status_code == 429 else "服务繁忙，请稍后重试"
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=detail,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+    return time.monotonic()
+
+
+def release_admission(admitted_at: float):
+    """释放准入占用的并发槽位"""
+    if admission_controller is not None:
+        admission_controller.release(time.monotonic() - admitted_at)
+
+
+async def run_analysis(
+    analyzer: EmotionAnalyzer,
+    text: str,
+    context: Optional[Dict[str, Any]] = None,
+    user_id: Optional[str] = None
+):
+    """
+    执行情感分析，依次经过结果缓存和微批调度器；
+    缓存中保存的是不含用户历史的共享结果，查询之后再附加用户近期情感，最后记入时间线
+    """
+    if result_cache is not None:
+        result = await result_cache.get_or_compute(
+            text, context, user_id,
+            lambda: _compute_analysis(analyzer, text, context, user_id)
+        )
+    else:
+        result = await _compute_analysis(analyzer, text, context, user_id)
+    
+    result = analyzer.personalize(result, user_id)
+    if emotion_timeline is not None and user_id:
+        emotion_timeline.append(user_id, result.emotion, result.intensity, result.confidence)
+    return result
+
+
+async def _compute_analysis(
+    analyzer: EmotionAnalyzer,
+    text: str,
+    context: Optional[Dict[str, Any]],
+    user_id: Optional[str]
+):
+    """实际执行模型分析"""
+    if batch_scheduler is not None:
+        return await batch_scheduler.analyze(text=text, context=context, user_id=user_id)
+    return await analyzer.analyze(text=text, context=context, user_id=user_id)
+
+
 # API端点
 @app.get("/health")
 async def health_check():
@@ -224,6 +517,55 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    就绪检查端点
+    
+    text_ready：文本分析链路（文本模型与融合引擎）可用；all_ready：所有模型均已加载
+    """
+    if model_loader is None:
+        return JSONResponse(status_code=503, content={"text_ready": False, "all_ready": False})
+    
+    text_ready = emotion_analyzer is not None and model_loader.is_loaded("text", "fusion")
+    status = {
+        "text_ready": text_ready,
+        "all_ready": text_ready and model_loader.is_loaded(*model_loader.names),
+        "models": model_loader.status(),
+        "load_seconds": {name: round(t, 3) for name, t in model_loader.timings.items()}
+    }
+    return JSONResponse(status_code=200 if text_ready else 503, content=status)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus指标端点"""
+    if model_loader is not None:
+        record_model_load_timings(model_loader.timings)
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@app.get("/stats")
+async def get_service_stats():
+    """服务内部运行统计"""
+    return {
+        "batching": batch_scheduler.get_stats() if batch_scheduler else None,
+        "result_cache": result_cache.get_stats() if result_cache else None,
+        "offload_pool": offload_pool.get_stats() if offload_pool else None,
+        "chat_pipeline": chat_pipeline.get_stats() if chat_pipeline else None,
+        "admission": admission_controller.get_stats() if admission_controller else None,
+        "rollups": emotion_rollups.get_stats() if emotion_rollups else None,
+        "timeline": emotion_timeline.get_stats() if emotion_timeline else None,
+        "navigation_graph": emotion_graph.get_stats() if emotion_graph else None,
+        "fast_json": {"enabled": FAST_JSON_ENABLED, "backend": FAST_JSON_BACKEND},
+        "write_behind": {
+            "emotion_analyses": analysis_writer.get_stats() if analysis_writer else None,
+            "chat_messages": chat_writer.get_stats() if chat_writer else None
+        }
+    }
+
+
 @app.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_emotion(
     request: AnalyzeRequest,
@@ -231,13 +573,15 @@ async def analyze_emotion(
     analyzer: EmotionAnalyzer = Depends(get_emotion_analyzer)
 ):
     """情感分析端点"""
+    admitted_at = await acquire_admission(request.userId)
     try:
         logger.info("开始情感分析", 
                    userId=request.userId, 
                    textLength=len(request.text))
         
         # 执行情感分析
-        result = await analyzer.analyze(
+        result = await run_analysis(
+            analyzer,
             text=request.text,
             context=request.context,
             user_id=request.userId
@@ -257,11 +601,16 @@ async def analyze_emotion(
                    emotion=result.emotion,
                    confidence=result.confidence)
         
-        return result
+        # 结果对象在此处才生成响应字典
+        if FAST_JSON_ENABLED:
+            return FastJSONResponse(result.to_dict())
+        return result.to_dict()
         
     except Exception as e:
         logger.error("情感分析失败", error=str(e), userId=request.userId)
         raise HTTPException(status_code=500, detail=f"情感分析失败: {str(e)}")
+    finally:
+        release_admission(admitted_at)
 
 
 @app.post("/chat")
@@ -272,25 +621,46 @@ async def chat_with_aurora(
     gpt: EmotionGPT = Depends(get_emotion_gpt)
 ):
     """与Aurora对话端点"""
+    admitted_at = await acquire_admission(request.userId)
     try:
         logger.info("开始情感对话", 
                    userId=request.userId, 
                    sessionId=request.sessionId)
         
-        # 分析用户情感
-        emotion_result = await analyzer.analyze(
-            text=request.message,
-            context=request.context,
-            user_id=request.userId
-        )
-        
-        # 生成回复
-        chat_result = await gpt.generate_response(
-            message=request.message,
-            emotion_context=emotion_result,
-            user_id=request.userId,
-            session_id=request.sessionId
-        )
+        if chat_pipeline is not None:
+            # 情感分析与回复生成重叠执行
+            emotion_result, chat_result = await chat_pipeline.run(
+                user_id=request.userId,
+                context=request.context,
+                analyze=lambda: run_analysis(
+                    analyzer,
+                    text=request.message,
+                    context=request.context,
+                    user_id=request.userId
+                ),
+                generate=lambda emotion_context: gpt.generate_response(
+                    message=request.message,
+                    emotion_context=emotion_context,
+                    user_id=request.userId,
+                    session_id=request.sessionId
+                )
+            )
+        else:
+            # 分析用户情感
+            emotion_result = await run_analysis(
+                analyzer,
+                text=request.message,
+                context=request.context,
+                user_id=request.userId
+            )
+            
+            # 生成回复
+            chat_result = await gpt.generate_response(
+                message=request.message,
+                emotion_context=emotion_result,
+                user_id=request.userId,
+                session_id=request.sessionId
+            )
         
         # 异步保存对话记录
         background_tasks.add_task(
@@ -309,11 +679,130 @@ async def chat_with_aurora(
                    emotionDetected=emotion_result.emotion)
         
         # 直接返回文本回复
+        if FAST_JSON_ENABLED:
+            return FastJSONResponse({"reply": chat_result.reply})
         return {"reply": chat_result.reply}
         
     except Exception as e:
         logger.error("情感对话失败", error=str(e), userId=request.userId)
         raise HTTPException(status_code=500, detail=f"对话失败: {str(e)}")
+    finally:
+        release_admission(admitted_at)
+
+
+@app.post("/chat/stream")
+async def chat_with_aurora_stream(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    analyzer: EmotionAnalyzer = Depends(get_emotion_analyzer),
+    gpt: EmotionGPT = Depends(get_emotion_gpt)
+):
+    """
+    与Aurora对话端点（SSE流式）
+    
+    事件顺序：emotion（检测到的情感）→ 若干token（回复片段）→ done（完整回复）；
+    出错时推送error事件
+    """
+    # 在开始推送前完成准入，拒绝时仍能返回429/503状态码
+    admitted_at = await acquire_admission(request.userId)
+    released = False
+    
+    def release_once():
+        # 生成器结束与响应后台任务都会调用，只释放一次
+        nonlocal released
+        if not released:
+            released = True
+            release_admission(admitted_at)
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            # 分析用户情感并作为首个事件推送
+            emotion_result = await run_analysis(
+                analyzer,
+                text=request.message,
+                context=request.context,
+                user_id=request.userId
+            )
+            yield _sse_event("emotion", {
+                "emotion": emotion_result.emotion,
+                "intensity": emotion_result.intensity,
+                "confidence": emotion_result.confidence
+            })
+            
+            # 逐片推送回复
+            reply_parts = []
+            async for token in _iter_reply_tokens(
+                gpt,
+                message=request.message,
+                emotion_context=emotion_result,
+                user_id=request.userId,
+                session_id=request.sessionId
+            ):
+                reply_parts.append(token)
+                yield _sse_event("token", {"text": token})
+            
+            reply = "".join(reply_parts)
+            yield _sse_event("done", {"reply": reply})
+            
+            # 流结束后保存完整对话记录（后台任务在响应发送完毕后执行）
+            background_tasks.add_task(
+                save_chat_record,
+                request.userId,
+                request.sessionId,
+                request.message,
+                reply,
+                emotion_result.emotion,
+                request.timestamp
+            )
+            
+            logger.info("流式情感对话完成", 
+                       userId=request.userId,
+                       sessionId=request.sessionId,
+                       emotionDetected=emotion_result.emotion)
+            
+        except Exception as e:
+            logger.error("流式情感对话失败", error=str(e), userId=request.userId)
+            yield _sse_event("error", {"detail": f"对话失败: {str(e)}"})
+        finally:
+            release_once()
+    
+    try:
+        logger.info("开始流式情感对话", 
+                   userId=request.userId, 
+                   sessionId=request.sessionId)
+        
+        # 客户端在首个片段前断开时生成器不会启动，由响应后台任务兜底释放；
+        # 该任务最先加入，保证先于保存对话记录等任务执行
+        background_tasks.add_task(release_once)
+        return StreamingResponse(
+            event_stream(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
+    except BaseException:
+        release_once()
+        raise
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """编码一条SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _iter_reply_tokens(gpt: EmotionGPT, **kwargs) -> AsyncIterator[str]:
+    """逐片获取回复；EmotionGPT不支持流式生成时整段返回"""
+    stream_response = getattr(gpt, "stream_response", None)
+    if stream_response is None:
+        chat_result = await gpt.generate_response(**kwargs)
+        yield chat_result.reply
+        return
+    
+    async for token in stream_response(**kwargs):
+        if token:
+            yield token
 
 
 @app.post("/navigate", response_model=NavigateResponse)
@@ -327,17 +816,33 @@ async def navigate_emotion(
                    currentEmotion=request.currentEmotion,
                    targetEmotion=request.targetEmotion)
         
-        # 生成导航路径
-        navigation_result = await navigator.generate_path(
-            current_emotion=request.currentEmotion,
-            target_emotion=request.targetEmotion,
-            preferences=request.preferences
-        )
+        # 优先查询预计算的转移图，图中没有的情感或查询出错时再调用导航模型
+        navigation_result = None
+        if emotion_graph:
+            try:
+                navigation_result = emotion_graph.get_path(
+                    request.currentEmotion,
+                    request.targetEmotion,
+                    request.preferences
+                )
+            except Exception as e:
+                logger.warning("情感转移图查询失败，回退到导航模型", error=str(e))
+        
+        if navigation_result is None:
+            navigation_result = await navigator.generate_path(
+                current_emotion=request.currentEmotion,
+                target_emotion=request.targetEmotion,
+                preferences=request.preferences
+            )
         
         logger.info("情感导航完成", 
                    pathLength=len(navigation_result.path),
                    estimatedTime=navigation_result.estimatedTime)
         
+        if FAST_JSON_ENABLED:
+            # 导航结果来自导航模型或转移图，仍按响应模型校验并过滤多余字段后再直接编码
+            validated = NavigateResponse.model_validate(navigation_result, from_attributes=True)
+            return FastJSONResponse(validated.model_dump())
         return navigation_result
         
     except Exception as e:
@@ -354,16 +859,28 @@ async def get_emotion_status(
     try:
         logger.info("获取情感状态", userId=userId, timeframe=timeframe)
         
-        # 从数据库获取情感历史
-        if db_manager:
-            status_data = await db_manager.get_emotion_status(userId, timeframe)
-        else:
-            # 模拟数据
-            status_data = {
-                "currentEmotion": "neutral",
-                "emotionHistory": [],
-                "averageIntensity": 0.5
-            }
+        # 优先从增量汇总读取，时间窗口未被完整覆盖时回退到数据库
+        status_data = emotion_rollups.get_status(userId, timeframe) if emotion_rollups else None
+        
+        if status_data is None:
+            # 从数据库获取情感历史
+            if db_manager:
+                status_data = await db_manager.get_emotion_status(userId, timeframe)
+            else:
+                # 模拟数据
+                status_data = {
+                    "currentEmotion": "neutral",
+                    "emotionHistory": [],
+                    "averageIntensity": 0.5
+                }
+        
+        # 附加内存时间线中的最近记录
+        if emotion_timeline:
+            recent = emotion_timeline.recent_records(userId)
+            if recent:
+                status_data = dict(status_data, recentEmotions=recent)
+                if not db_manager and not emotion_rollups:
+                    status_data["currentEmotion"] = recent[-1]["emotion"]
         
         return status_data
         
@@ -373,11 +890,56 @@ async def get_emotion_status(
 
 
 # 后台任务函数
+async def refresh_emotion_rollups() -> bool:
+    """
+    用数据库中的分析记录更新情感汇总：首次全量读取保留期，之后只读取上次读取以来的记录；
+    数据库不支持按时间读取时返回False
+    """
+    load_records = getattr(db_manager, "get_emotion_analyses_since", None)
+    if emotion_rollups is None or load_records is None:
+        if emotion_rollups is not None:
+            logger.warning("数据库不支持按时间读取分析记录，情感汇总只覆盖本进程启动后的数据")
+        return False
+    
+    started = time.perf_counter()
+    since = emotion_rollups.begin_load()
+    try:
+        # 先写出缓冲中的记录，保证读取结果包含本进程已保存的分析
+        if analysis_writer:
+            await analysis_writer.flush()
+        records = await load_records(since)
+    except BaseException:
+        emotion_rollups.abort_load()
+        raise
+    emotion_rollups.load(records)
+    logger.info("情感汇总已从数据库更新",
+               users=emotion_rollups.get_stats()["users"],
+               seconds=round(time.perf_counter() - started, 3))
+    return True
+
+
+async def _refresh_rollups_periodically():
+    """定期从数据库更新情感汇总"""
+    while True:
+        await asyncio.sleep(ROLLUPS_REFRESH_SECONDS)
+        try:
+            await refresh_emotion_rollups()
+        except Exception as e:
+            logger.error("从数据库更新情感汇总失败", error=str(e))
+
+
 async def save_analysis_result(user_id: str, result: AnalyzeResponse, timestamp: str):
     """保存分析结果到数据库"""
     try:
-        if db_manager:
+        if emotion_rollups:
+            # 汇总按服务端时间分桶，不使用客户端提供的时间戳
+            emotion_rollups.record(user_id, result.emotion, result.intensity)
+        if analysis_writer:
+            await analysis_writer.add((user_id, result, timestamp))
+        elif db_manager:
+            started = time.perf_counter()
             await db_manager.save_emotion_analysis(user_id, result, timestamp)
+            observe_stage("db_save", time.perf_counter() - started)
     except Exception as e:
         logger.error("保存分析结果失败", error=str(e), userId=user_id)
 
@@ -386,13 +948,48 @@ async def save_chat_record(user_id: str, session_id: str, message: str,
                           reply: str, emotion: str, timestamp: str):
     """保存对话记录到数据库"""
     try:
-        if db_manager:
+        if chat_writer:
+            await chat_writer.add((user_id, session_id, message, reply, emotion, timestamp))
+        elif db_manager:
             await db_manager.save_chat_record(user_id, session_id, message, 
                                             reply, emotion, timestamp)
     except Exception as e:
         logger.error("保存对话记录失败", error=str(e), userId=user_id)
 
 
+async def _flush_analysis_records(records: List[tuple]):
+    """批量写入分析结果：优先使用多行插入，否则逐条写入"""
+    if not db_manager:
+        return
+    started = time.perf_counter()
+    bulk_save = getattr(db_manager, "save_emotion_analyses_bulk", None)
+    if bulk_save is not None:
+        await bulk_save(records)
+    else:
+        # 逐条写入时单条失败只记录日志，避免整批重试造成重复写入
+        for user_id, result, timestamp in records:
+            try:
+                await db_manager.save_emotion_analysis(user_id, result, timestamp)
+            except Exception as e:
+                logger.error("保存分析结果失败", error=str(e), userId=user_id)
+    observe_stage("db_save", time.perf_counter() - started)
+
+
+async def _flush_chat_records(records: List[tuple]):
+    """批量写入对话记录：优先使用多行插入，否则逐条写入"""
+    if not db_manager:
+        return
+    bulk_save = getattr(db_manager, "save_chat_records_bulk", None)
+    if bulk_save is not None:
+        await bulk_save(records)
+        return
+    for record in records:
+        try:
+            await db_manager.save_chat_record(*record)
+        except Exception as e:
+            logger.error("保存对话记录失败", error=str(e), userId=record[0])
+
+
 if __name__ == "__main__":
     # 启动服务
     uvicorn.run(
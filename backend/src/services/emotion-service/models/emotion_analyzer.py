@@ -4,29 +4,273 @@ Aurora情感分析器
 """
 
 import asyncio
+import base64
+import binascii
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+import time
+from typing import Dict, List, Optional, Any, Sequence, Tuple, Union
 import numpy as np
-from dataclasses import dataclass
 import structlog
 
 from .text_processor import TextProcessor
 from .audio_processor import AudioProcessor
 from .visual_processor import VisualProcessor
 from .fusion_engine import FusionEngine
+from ..utils.model_loader import ModelLoader
+from ..utils.metrics import observe_stage
+from ..utils.emotion_timeline import EmotionTimelineStore
 
 logger = structlog.get_logger()
 
 
-@dataclass
+# 情感类别映射；情感在分析链路中以该表中的下标（情感ID）表示
+EMOTION_MAPPING = {
+    'joy': '快乐',
+    'sadness': '悲伤',
+    'anger': '愤怒',
+    'fear': '恐惧',
+    'surprise': '惊讶',
+    'disgust': '厌恶',
+    'neutral': '中性',
+    'anxiety': '焦虑',
+    'calm': '平静',
+    'excitement': '兴奋',
+    'frustration': '沮丧',
+    'contentment': '满足',
+    'loneliness': '孤独',
+    'love': '爱',
+    'hope': '希望'
+}
+EMOTION_LABELS = tuple(EMOTION_MAPPING)
+EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTION_LABELS)}
+NEUTRAL_ID = EMOTION_INDEX['neutral']
+
+# 从概率向量选取次要情感的数量上限与最小概率
+SECONDARY_TOP_K = 3
+SECONDARY_THRESHOLD = 0.1
+
+ANALYSIS_TIMESTAMP = '2024-01-01T00:00:00Z'
+
+
+def scores_to_probability_matrix(
+    score_rows: Sequence[Dict[str, float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """把多组情感分数字典堆叠为按情感ID排列的概率矩阵，返回(概率矩阵, 有效行掩码)"""
+    matrix = np.zeros((len(score_rows), len(EMOTION_LABELS)), dtype=np.float32)
+    for row, emotion_scores in enumerate(score_rows):
+        for emotion, score in emotion_scores.items():
+            col = EMOTION_INDEX.get(emotion)
+            if col is not None:
+                matrix[row, col] = float(score)
+    np.maximum(matrix, 0.0, out=matrix)
+    totals = matrix.sum(axis=1)
+    valid = totals > 0
+    matrix[valid] /= totals[valid, None]
+    return matrix, valid
+
+
+def scores_to_probabilities(emotion_scores: Dict[str, float]) -> Optional[np.ndarray]:
+    """把情感分数字典转换为按情感ID排列的概率向量，无有效分数时返回None"""
+    matrix, valid = scores_to_probability_matrix([emotion_scores])
+    return matrix[0] if valid[0] else None
+
+
+def describe_recent_history(recent_history: Dict[str, Any]) -> str:
+    """把用户情感时间线摘要描述为推理片段"""
+    dominant = EMOTION_MAPPING.get(recent_history['dominant_emotion'], recent_history['dominant_emotion'])
+    description = (
+        f"用户近期{recent_history['count']}次分析以{dominant}为主，"
+        f"平均强度{recent_history['average_intensity']:.2f}"
+    )
+    trend = recent_history['intensity_trend']
+    if abs(trend) >= 0.1:
+        description += "，情感强度呈上升趋势" if trend > 0 else "，情感强度呈下降趋势"
+    return description
+
+
 class EmotionResult:
-    """情感分析结果"""
-    emotion: str
-    intensity: float
-    confidence: float
-    reasoning: str
-    secondary_emotions: Optional[List[Dict[str, Any]]] = None
-    metadata: Optional[Dict[str, Any]] = None
+    """
+    情感分析结果
+    
+    热路径上只保存情感ID、数值以及分数分布和推理过程的来源；
+    emotion/reasoning/secondary_emotions/metadata 在访问时（通常是序列化时）才生成字符串和字典
+    """
+    
+    __slots__ = (
+        'emotion_id', 'intensity', 'confidence', '_probabilities',
+        '_label', '_reasoning', '_reasoning_source', '_secondary', '_metadata',
+        'user_id', 'text_length', 'has_context', 'model_version',
+        'timed_out_modalities', 'personalized', '_recent_history'
+    )
+    
+    def __init__(
+        self,
+        emotion: Optional[str] = None,
+        intensity: float = 0.5,
+        confidence: float = 0.5,
+        reasoning: Union[str, Sequence[str]] = '',
+        secondary_emotions: Optional[List[Dict[str, Any]]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        *,
+        emotion_id: Optional[int] = None,
+        probabilities: Union[np.ndarray, Dict[str, float], None] = None,
+        reasoning_source: Optional[Tuple[Any, ...]] = None,
+        user_id: Optional[str] = None,
+        text_length: Optional[int] = None,
+        has_context: bool = False,
+        model_version: Optional[str] = None,
+        timed_out_modalities: Optional[List[str]] = None,
+        personalized: bool = False
+    ):
+        # 情感表之外的情感名称原样保留
+        self._label = None
+        if emotion_id is None:
+            emotion_id = EMOTION_INDEX.get(emotion if emotion is not None else 'neutral', -1)
+            if emotion_id < 0:
+                self._label = emotion
+        self.emotion_id = emotion_id
+        self.intensity = intensity
+        self.confidence = confidence
+        # 概率向量，或尚未转换的情感分数字典
+        self._probabilities = probabilities
+        # 推理过程可以是字符串、待拼接的片段序列，
+        # 或 (生成函数, *参数)：首次访问时调用生成函数得到片段
+        self._reasoning = reasoning
+        self._reasoning_source = reasoning_source
+        self._secondary = secondary_emotions
+        # 显式传入的元数据字典（如缓存反序列化、预测结果）；否则由下列字段在访问时生成
+        self._metadata = metadata
+        self.user_id = user_id
+        self.text_length = text_length
+        self.has_context = has_context
+        self.model_version = model_version
+        self.timed_out_modalities = timed_out_modalities
+        self.personalized = personalized
+        # 用户情感时间线摘要：在缓存查询之后按用户附加，不随共享结果缓存
+        self._recent_history = None
+    
+    @property
+    def emotion(self) -> str:
+        return EMOTION_LABELS[self.emotion_id] if self.emotion_id >= 0 else self._label
+    
+    @property
+    def probabilities(self) -> Optional[np.ndarray]:
+        if isinstance(self._probabilities, dict):
+            self._probabilities = scores_to_probabilities(self._probabilities)
+        return self._probabilities
+    
+    @property
+    def reasoning(self) -> str:
+        if self._reasoning_source is not None:
+            generate, *args = self._reasoning_source
+            self._reasoning = generate(*args)
+            self._reasoning_source = None
+        if not isinstance(self._reasoning, str):
+            self._reasoning = "；".join(self._reasoning)
+        if self._recent_history:
+            return f"{self._reasoning}；用户近期情感：{describe_recent_history(self._recent_history)}"
+        return self._reasoning
+    
+    @property
+    def secondary_emotions(self) -> List[Dict[str, Any]]:
+        """次要情感：优先使用融合引擎给出的列表，否则从概率向量中选取top-k；都没有时为空列表"""
+        if self._secondary is not None:
+            return [
+                {
+                    'emotion': item.get('emotion'),
+                    'intensity': item.get('intensity', 0.0),
+                    'confidence': item.get('confidence', 0.0)
+                }
+                for item in self._secondary
+            ]
+        probabilities = self.probabilities
+        if probabilities is None:
+            return []
+        
+        masked = probabilities.copy()
+        if self.emotion_id >= 0:
+            masked[self.emotion_id] = -1.0
+        k = min(SECONDARY_TOP_K, len(masked) - 1)
+        top = np.argpartition(-masked, k)[:k]
+        top = top[np.argsort(-masked[top])]
+        return [
+            {
+                'emotion': EMOTION_LABELS[i],
+                'intensity': float(masked[i]) * self.intensity,
+                'confidence': float(masked[i])
+            }
+            for i in top
+            if masked[i] >= SECONDARY_THRESHOLD
+        ]
+    
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        if self._metadata is not None or self.model_version is None:
+            return self._metadata
+        metadata = {
+            'text_length': self.text_length,
+            'has_context': self.has_context,
+            'user_id': self.user_id,
+            'analysis_timestamp': ANALYSIS_TIMESTAMP,
+            'model_version': self.model_version
+        }
+        if self.timed_out_modalities:
+            metadata['timed_out_modalities'] = self.timed_out_modalities
+        if self.personalized:
+            metadata['personalized'] = True
+        return metadata
+    
+    def meta(self, key: str, default: Any = None) -> Any:
+        """读取单个元数据字段，不生成元数据字典"""
+        if self._metadata is not None:
+            return self._metadata.get(key, default)
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def with_user(
+        self,
+        user_id: Optional[str],
+        recent_history: Optional[Dict[str, Any]] = None
+    ) -> 'EmotionResult':
+        """复制结果，替换元数据中的用户ID并附加该用户的近期情感摘要"""
+        result = self.copy()
+        if result._metadata is not None:
+            result._metadata = dict(result._metadata, user_id=user_id)
+            if recent_history:
+                result._metadata['personalized'] = True
+        result.user_id = user_id
+        result._recent_history = recent_history or None
+        result.personalized = bool(recent_history)
+        return result
+    
+    def copy(self) -> 'EmotionResult':
+        result = EmotionResult.__new__(EmotionResult)
+        result.copy_from(self)
+        return result
+    
+    def copy_from(self, other: 'EmotionResult'):
+        """就地替换为另一个结果的内容"""
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为与AnalyzeResponse一致的字典"""
+        return {
+            'emotion': self.emotion,
+            'intensity': self.intensity,
+            'confidence': self.confidence,
+            'reasoning': self.reasoning,
+            'secondary_emotions': self.secondary_emotions,
+            'metadata': self.metadata
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EmotionResult':
+        return cls(**data)
+    
+    def __repr__(self) -> str:
+        return (f"EmotionResult(emotion={self.emotion!r}, intensity={self.intensity!r}, "
+                f"confidence={self.confidence!r})")
 
 
 class EmotionAnalyzer:
@@ -37,31 +281,50 @@ class EmotionAnalyzer:
         text_processor: TextProcessor,
         audio_processor: AudioProcessor,
         visual_processor: VisualProcessor,
-        fusion_engine: FusionEngine
+        fusion_engine: FusionEngine,
+        modality_timeouts: Optional[Dict[str, Optional[float]]] = None,
+        offload_pool=None,
+        model_loader: Optional[ModelLoader] = None,
+        timeline: Optional[EmotionTimelineStore] = None,
+        history_window: float = 86400.0
     ):
         self.text_processor = text_processor
         self.audio_processor = audio_processor
         self.visual_processor = visual_processor
         self.fusion_engine = fusion_engine
         
-        # 情感类别映射
-        self.emotion_mapping = {
-            'joy': '快乐',
-            'sadness': '悲伤',
-            'anger': '愤怒',
-            'fear': '恐惧',
-            'surprise': '惊讶',
-            'disgust': '厌恶',
-            'neutral': '中性',
-            'anxiety': '焦虑',
-            'calm': '平静',
-            'excitement': '兴奋',
-            'frustration': '沮丧',
-            'contentment': '满足',
-            'loneliness': '孤独',
-            'love': '爱',
-            'hope': '希望'
+        # 各模态分析的截止时间（秒），None表示不限时
+        self.modality_timeouts = {
+            'text': 5.0,
+            'audio': 3.0,
+            'visual': 3.0
         }
+        if modality_timeouts:
+            self.modality_timeouts.update(modality_timeouts)
+        
+        # 可选的音视频处理进程池，启用后CPU密集的解码不再占用事件循环
+        self.offload_pool = offload_pool
+        
+        # 模型加载器：与服务共享时各处理器只加载一次，音频/视觉可延迟加载
+        if model_loader is None:
+            model_loader = ModelLoader()
+            model_loader.register('text', text_processor.load_models)
+            model_loader.register('audio', audio_processor.load_models)
+            model_loader.register('visual', visual_processor.load_models)
+            model_loader.register('fusion', fusion_engine.initialize)
+        self.model_loader = model_loader
+        
+        # 可选的用户情感时间线，用于结合用户近期情感生成上下文推理（秒级时间窗口）
+        self.timeline = timeline
+        self.history_window = history_window
+        
+        # 模型版本，写入结果元数据并用于结果缓存失效
+        self.model_version = '1.0.0'
+        
+        # 情感类别映射，以及情感ID使用的类别顺序与索引
+        self.emotion_mapping = EMOTION_MAPPING
+        self.emotion_labels = EMOTION_LABELS
+        self.emotion_index = EMOTION_INDEX
         
         # 情感强度阈值
         self.intensity_thresholds = {
@@ -75,13 +338,8 @@ class EmotionAnalyzer:
         try:
             logger.info("开始加载情感分析模型...")
             
-            # 并行加载所有处理器
-            await asyncio.gather(
-                self.text_processor.load_models(),
-                self.audio_processor.load_models(),
-                self.visual_processor.load_models(),
-                self.fusion_engine.initialize()
-            )
+            # 并行加载所有非延迟模型，已加载的模型不会重复加载
+            await self.model_loader.load_eager()
             
             logger.info("情感分析模型加载完成")
             
@@ -111,30 +369,9 @@ class EmotionAnalyzer:
                        userId=user_id, 
                        textLength=len(text))
             
-            # 1. 文本情感分析
-            text_result = await self._analyze_text(text, context)
-            
-            # 2. 音频情感分析（如果有音频数据）
-            audio_result = None
-            if context and 'audio_data' in context:
-                audio_result = await self._analyze_audio(context['audio_data'])
-            
-            # 3. 视觉情感分析（如果有视觉数据）
-            visual_result = None
-            if context and 'visual_data' in context:
-                visual_result = await self._analyze_visual(context['visual_data'])
-            
-            # 4. 多模态融合
-            fusion_result = await self.fusion_engine.fuse_modalities(
-                text_result=text_result,
-                audio_result=audio_result,
-                visual_result=visual_result,
-                context=context
-            )
-            
-            # 5. 生成最终结果
-            final_result = await self._generate_final_result(
-                fusion_result, text, context, user_id
+            # 1-5. 各模态并发分析、多模态融合并生成最终结果
+            final_result = await self._complete_analysis(
+                text, None, context, user_id
             )
             
             logger.info("多模态情感分析完成", 
@@ -148,6 +385,131 @@ class EmotionAnalyzer:
             logger.error("情感分析失败", error=str(e), userId=user_id)
             raise
     
+    async def analyze_batch_items(
+        self,
+        items: List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]
+    ) -> List[Any]:
+        """
+        对一组独立请求执行情感分析，文本模型只做一次批量前向
+        
+        Args:
+            items: (text, context, user_id) 三元组列表
+            
+        Returns:
+            与items一一对应的列表，元素为EmotionResult或该条目抛出的异常
+        """
+        texts = [item[0] for item in items]
+        contexts = [item[1] for item in items]
+        
+        # 1. 批量文本情感分析
+        text_results = await self._analyze_text_batch(texts, contexts)
+        
+        # 2-5. 其余步骤逐条执行，单条失败不影响其他条目
+        return await asyncio.gather(
+            *[
+                self._complete_analysis(text, text_result, context, user_id)
+                for (text, context, user_id), text_result in zip(items, text_results)
+            ],
+            return_exceptions=True
+        )
+    
+    async def _complete_analysis(
+        self,
+        text: str,
+        text_result: Optional[Dict[str, Any]],
+        context: Optional[Dict[str, Any]],
+        user_id: Optional[str]
+    ) -> EmotionResult:
+        """并发执行尚未完成的各模态分析，融合后生成最终结果"""
+        modality_tasks = {}
+        
+        # 1. 文本情感分析（批量路径中已提前完成）
+        if text_result is None:
+            modality_tasks['text'] = self._analyze_text(text, context)
+        
+        # 2. 音频情感分析（如果有音频数据）
+        if context and 'audio_data' in context:
+            modality_tasks['audio'] = self._analyze_audio(context['audio_data'])
+        
+        # 3. 视觉情感分析（如果有视觉数据）
+        if context and 'visual_data' in context:
+            modality_tasks['visual'] = self._analyze_visual(context['visual_data'])
+        
+        modality_results, timed_out = await self._run_modalities(modality_tasks)
+        
+        if text_result is None:
+            text_result = modality_results.get('text') or {
+                'emotion': 'neutral',
+                'intensity': 0.5,
+                'confidence': 0.3,
+                'reasoning': '文本分析超时，使用默认结果'
+            }
+        
+        # 4. 多模态融合（超时的模态不参与融合）
+        started = time.perf_counter()
+        fusion_result = await self.fusion_engine.fuse_modalities(
+            text_result=text_result,
+            audio_result=modality_results.get('audio'),
+            visual_result=modality_results.get('visual'),
+            context=context
+        )
+        fused = time.perf_counter()
+        observe_stage('fusion', fused - started)
+        
+        # 5. 生成最终结果
+        final_result = await self._generate_final_result(
+            fusion_result, text, context, user_id, timed_out
+        )
+        observe_stage('result', time.perf_counter() - fused)
+        return final_result
+    
+    async def _run_modalities(
+        self,
+        modality_tasks: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        并发运行各模态分析，每个模态受各自截止时间约束
+        
+        Returns:
+            (模态名 -> 分析结果, 超时被丢弃的模态列表)
+        """
+        if not modality_tasks:
+            return {}, []
+        
+        names = list(modality_tasks)
+        outcomes = await asyncio.gather(
+            *[
+                self._with_deadline(name, modality_tasks[name])
+                for name in names
+            ],
+            return_exceptions=True
+        )
+        
+        results = {}
+        timed_out = []
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                timed_out.append(name)
+            elif isinstance(outcome, Exception):
+                logger.error("模态分析失败", modality=name, error=str(outcome))
+            else:
+                results[name] = outcome
+        
+        return results, timed_out
+    
+    async def _with_deadline(self, modality: str, coro) -> Any:
+        """在模态截止时间内等待分析结果"""
+        timeout = self.modality_timeouts.get(modality)
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, timeout if timeout and timeout > 0 else None)
+        except asyncio.TimeoutError:
+            logger.warning("模态分析超时，已从融合中剔除", 
+                          modality=modality, timeout=timeout)
+            raise
+        finally:
+            observe_stage(modality, time.perf_counter() - started)
+    
     async def _analyze_text(
         self, 
         text: str, 
@@ -174,6 +536,41 @@ class EmotionAnalyzer:
                 'reasoning': '文本分析失败，使用默认结果'
             }
     
+    async def _analyze_text_batch(
+        self,
+        texts: List[str],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """批量分析文本情感"""
+        started = time.perf_counter()
+        try:
+            return await self._run_text_batch(texts, contexts)
+        finally:
+            observe_stage('text_batch', time.perf_counter() - started)
+    
+    async def _run_text_batch(
+        self,
+        texts: List[str],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """优先使用文本处理器的批量接口，否则逐条并发分析"""
+        batch_fn = getattr(self.text_processor, 'batch_analyze', None)
+        if batch_fn is not None:
+            try:
+                results = await batch_fn(texts, contexts)
+                if len(results) == len(texts):
+                    logger.debug("批量文本情感分析完成", batchSize=len(texts))
+                    return list(results)
+                logger.error("批量文本分析结果数量不匹配",
+                           expected=len(texts), actual=len(results))
+            except Exception as e:
+                logger.error("批量文本情感分析失败", error=str(e), batchSize=len(texts))
+        
+        # 文本处理器不支持批量或批量失败时，逐条分析（单条失败返回默认结果）
+        return await asyncio.gather(
+            *[self._analyze_text(text, context) for text, context in zip(texts, contexts)]
+        )
+    
     async def _analyze_audio(
         self, 
         audio_data: bytes
@@ -181,7 +578,12 @@ class EmotionAnalyzer:
         """分析音频情感"""
         try:
             # 使用音频处理器分析语音情感
-            result = await self.audio_processor.analyze(audio_data)
+            payload = self._offload_payload('audio', audio_data)
+            if payload is not None:
+                result = await self.offload_pool.analyze('audio', payload)
+            else:
+                await self.model_loader.ensure('audio')
+                result = await self.audio_processor.analyze(audio_data)
             
             logger.debug("音频情感分析完成", 
                         emotion=result.get('emotion'),
@@ -200,7 +602,12 @@ class EmotionAnalyzer:
         """分析视觉情感"""
         try:
             # 使用视觉处理器分析面部表情
-            result = await self.visual_processor.analyze(visual_data)
+            payload = self._offload_payload('visual', visual_data)
+            if payload is not None:
+                result = await self.offload_pool.analyze('visual', payload)
+            else:
+                await self.model_loader.ensure('visual')
+                result = await self.visual_processor.analyze(visual_data)
             
             logger.debug("视觉情感分析完成", 
                         emotion=result.get('emotion'),
@@ -212,81 +619,92 @@ class EmotionAnalyzer:
             logger.error("视觉情感分析失败", error=str(e))
             return None
     
+    def _offload_payload(self, modality: str, data: Any) -> Optional[Union[bytes, bytearray, memoryview]]:
+        """
+        进程池已启用时返回交给工作进程的原始字节，否则返回None（在本进程内处理）
+
+        JSON请求中的音视频数据是base64字符串（可带data URL前缀），先解码为字节；
+        无法解码的数据仍交给本进程的处理器
+        """
+        if self.offload_pool is None or not self.offload_pool.supports(modality):
+            return None
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return data
+        if isinstance(data, str):
+            _, sep, encoded = data.partition('base64,')
+            try:
+                return base64.b64decode(encoded if sep else data, validate=True)
+            except (binascii.Error, ValueError):
+                return None
+        return None
+    
     async def _generate_final_result(
         self,
         fusion_result: Dict[str, Any],
         text: str,
         context: Optional[Dict[str, Any]],
-        user_id: Optional[str]
+        user_id: Optional[str],
+        timed_out_modalities: Optional[List[str]] = None
     ) -> EmotionResult:
         """生成最终的情感分析结果"""
+        return self._build_final_result(
+            fusion_result, text, context, user_id, timed_out_modalities
+        )
+    
+    def _build_final_result(
+        self,
+        fusion_result: Dict[str, Any],
+        text: str,
+        context: Optional[Dict[str, Any]],
+        user_id: Optional[str],
+        timed_out_modalities: Optional[List[str]] = None
+    ) -> EmotionResult:
+        """根据融合结果构建EmotionResult（不含用户近期情感，可在用户之间共享）"""
         try:
-            # 提取融合结果
-            emotion = fusion_result.get('emotion', 'neutral')
-            intensity = fusion_result.get('intensity', 0.5)
-            confidence = fusion_result.get('confidence', 0.5)
-            reasoning = fusion_result.get('reasoning', '基于多模态分析')
-            
-            # 生成次要情感
-            secondary_emotions = self._extract_secondary_emotions(fusion_result)
-            
-            # 生成元数据
-            metadata = {
-                'text_length': len(text),
-                'has_context': context is not None,
-                'user_id': user_id,
-                'analysis_timestamp': '2024-01-01T00:00:00Z',
-                'model_version': '1.0.0'
-            }
-            
-            # 生成推理过程
-            detailed_reasoning = self._generate_detailed_reasoning(
-                fusion_result, text, context
-            )
-            
+            # 次要情感、推理文本和元数据字典都推迟到序列化时生成
+            emotion_id = fusion_result.get('emotion_id')
             return EmotionResult(
-                emotion=emotion,
-                intensity=intensity,
-                confidence=confidence,
-                reasoning=detailed_reasoning,
-                secondary_emotions=secondary_emotions,
-                metadata=metadata
+                emotion=None if emotion_id is not None else fusion_result.get('emotion', 'neutral'),
+                emotion_id=emotion_id,
+                intensity=fusion_result.get('intensity', 0.5),
+                confidence=fusion_result.get('confidence', 0.5),
+                reasoning_source=(
+                    self._generate_detailed_reasoning,
+                    fusion_result, text, context
+                ),
+                secondary_emotions=fusion_result.get('secondary_emotions'),
+                probabilities=self._extract_probabilities(fusion_result),
+                user_id=user_id,
+                text_length=len(text),
+                has_context=context is not None,
+                model_version=self.model_version,
+                timed_out_modalities=timed_out_modalities or None
             )
             
         except Exception as e:
             logger.error("生成最终结果失败", error=str(e))
             raise
     
-    def _extract_secondary_emotions(
+    def _extract_probabilities(
         self, 
         fusion_result: Dict[str, Any]
-    ) -> List[Dict[str, Any]]:
-        """提取次要情感"""
-        try:
-            secondary_emotions = []
-            
-            # 从融合结果中提取次要情感
-            if 'secondary_emotions' in fusion_result:
-                for emotion_data in fusion_result['secondary_emotions']:
-                    secondary_emotions.append({
-                        'emotion': emotion_data.get('emotion'),
-                        'intensity': emotion_data.get('intensity', 0.0),
-                        'confidence': emotion_data.get('confidence', 0.0)
-                    })
-            
-            return secondary_emotions
-            
-        except Exception as e:
-            logger.error("提取次要情感失败", error=str(e))
-            return []
+    ) -> Union[np.ndarray, Dict[str, float], None]:
+        """提取情感概率向量或原始分数字典（在首次读取时才转换为向量）"""
+        probabilities = fusion_result.get('probabilities')
+        if probabilities is not None:
+            return probabilities
+        emotion_scores = fusion_result.get('emotion_scores')
+        if isinstance(emotion_scores, dict) and emotion_scores:
+            return emotion_scores
+        return None
     
     def _generate_detailed_reasoning(
         self,
         fusion_result: Dict[str, Any],
         text: str,
         context: Optional[Dict[str, Any]]
-    ) -> str:
-        """生成详细的分析推理过程"""
+    ) -> List[str]:
+        """生成详细的分析推理过程片段，由EmotionResult在序列化时拼接"""
         try:
             reasoning_parts = []
             
@@ -318,11 +736,11 @@ class EmotionAnalyzer:
                 if context_reasoning:
                     reasoning_parts.append(f"上下文影响：{context_reasoning}")
             
-            return "；".join(reasoning_parts)
+            return reasoning_parts
             
         except Exception as e:
             logger.error("生成推理过程失败", error=str(e))
-            return "基于多模态情感分析"
+            return ["基于多模态情感分析"]
     
     def _analyze_context_influence(
         self, 
@@ -354,6 +772,19 @@ class EmotionAnalyzer:
             logger.error("分析上下文影响失败", error=str(e))
             return ""
     
+    def personalize(self, result: EmotionResult, user_id: Optional[str]) -> EmotionResult:
+        """
+        为共享（可能来自缓存）的结果附加用户近期情感
+        
+        时间线未启用、没有用户ID或用户无近期记录时原样返回
+        """
+        if self.timeline is None or not user_id:
+            return result
+        recent_history = self.timeline.summary(user_id, self.history_window)
+        if not recent_history:
+            return result
+        return result.with_user(user_id, recent_history)
+    
     def get_emotion_intensity_level(self, intensity: float) -> str:
         """获取情感强度等级"""
         if intensity < self.intensity_thresholds['low']:
@@ -378,37 +809,141 @@ class EmotionAnalyzer:
         try:
             logger.info("开始批量情感分析", textCount=len(texts))
             
-            # 并行处理所有文本
-            tasks = []
-            for i, text in enumerate(texts):
-                context = contexts[i] if contexts and i < len(contexts) else None
-                task = self.analyze(text, context)
-                tasks.append(task)
+            contexts = [
+                contexts[i] if contexts and i < len(contexts) else None
+                for i in range(len(texts))
+            ]
             
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # 1. 一次批量文本前向
+            text_results = await self._analyze_text_batch(texts, contexts)
             
-            # 处理异常结果
-            processed_results = []
+            results: List[Any] = [None] * len(texts)
+            text_only = []
+            multimodal = []
+            for i, context in enumerate(contexts):
+                if context and ('audio_data' in context or 'visual_data' in context):
+                    multimodal.append(i)
+                else:
+                    text_only.append(i)
+            
+            # 2. 纯文本条目：与analyze()相同地交给融合引擎（各自的上下文），再在堆叠的概率矩阵上批量构建结果
+            if text_only:
+                fusion_results = await self._fuse_text_batch(
+                    [text_results[i] for i in text_only],
+                    [contexts[i] for i in text_only]
+                )
+                built = self._build_results_bulk(
+                    fusion_results,
+                    [texts[i] for i in text_only],
+                    [contexts[i] for i in text_only]
+                )
+                for i, result in zip(text_only, built):
+                    results[i] = result
+            
+            # 3. 多模态条目走完整的逐条路径
+            if multimodal:
+                outcomes = await asyncio.gather(
+                    *[
+                        self._complete_analysis(texts[i], text_results[i], contexts[i], None)
+                        for i in multimodal
+                    ],
+                    return_exceptions=True
+                )
+                for i, outcome in zip(multimodal, outcomes):
+                    results[i] = outcome
+            
+            # 4. 处理异常结果
+            failures = 0
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
+                    failures += 1
                     logger.error("批量分析中单个文本失败", 
                                textIndex=i, error=str(result))
                     # 创建默认结果
-                    processed_results.append(EmotionResult(
+                    results[i] = EmotionResult(
                         emotion='neutral',
                         intensity=0.5,
                         confidence=0.3,
                         reasoning='分析失败，使用默认结果'
-                    ))
-                else:
-                    processed_results.append(result)
+                    )
             
             logger.info("批量情感分析完成", 
                        textCount=len(texts),
-                       successCount=len([r for r in results if not isinstance(r, Exception)]))
+                       successCount=len(texts) - failures)
             
-            return processed_results
+            return results
             
         except Exception as e:
             logger.error("批量情感分析失败", error=str(e))
             raise
+    
+    async def _fuse_text_batch(
+        self,
+        text_results: List[Dict[str, Any]],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[Any]:
+        """
+        融合一组纯文本结果：优先使用融合引擎的批量接口，否则逐条并发融合
+        
+        Returns:
+            与输入一一对应的融合结果，单条失败时为该条的异常
+        """
+        batch_fn = getattr(self.fusion_engine, 'fuse_batch', None)
+        if batch_fn is not None:
+            try:
+                results = await batch_fn(text_results, contexts)
+                if len(results) == len(text_results):
+                    return list(results)
+                logger.error("批量融合结果数量不匹配",
+                           expected=len(text_results), actual=len(results))
+            except Exception as e:
+                logger.error("批量融合失败", error=str(e), batchSize=len(text_results))
+        
+        return await asyncio.gather(
+            *[
+                self.fusion_engine.fuse_modalities(
+                    text_result=text_result,
+                    audio_result=None,
+                    visual_result=None,
+                    context=context
+                )
+                for text_result, context in zip(text_results, contexts)
+            ],
+            return_exceptions=True
+        )
+    
+    def _build_results_bulk(
+        self,
+        fusion_results: List[Any],
+        texts: List[str],
+        contexts: List[Optional[Dict[str, Any]]]
+    ) -> List[Any]:
+        """
+        批量构建EmotionResult
+        
+        只给出情感分数字典的融合结果在一个矩阵上统一归一化为概率向量
+        （与单条结果首次读取时的转换相同），其余字段与_build_final_result一致
+        """
+        results: List[Any] = []
+        pending_rows = []
+        pending_scores = []
+        for fusion_result, text, context in zip(fusion_results, texts, contexts):
+            if isinstance(fusion_result, Exception):
+                results.append(fusion_result)
+                continue
+            try:
+                result = self._build_final_result(fusion_result, text, context, None)
+            except Exception as e:
+                results.append(e)
+                continue
+            if isinstance(result._probabilities, dict):
+                pending_rows.append(result)
+                pending_scores.append(result._probabilities)
+            results.append(result)
+        
+        if pending_rows:
+            matrix, valid = scores_to_probability_matrix(pending_scores)
+            for row, result in enumerate(pending_rows):
+                result._probabilities = matrix[row] if valid[row] else None
+        
+        return results
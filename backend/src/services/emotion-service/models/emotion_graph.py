@@ -0,0 +1,292 @@
+"""
+Aurora情感转移图
+启动时在全部情感类别上构建带权有向转移图，用Floyd–Warshall预计算所有情感对之间的最短路径、
+预计时间和难度；/navigate只需查表并按用户偏好做轻量个性化
+
+注意：启用后导航结果中的练习和建议来自本模块内置的 ACTIVITIES / DIFFICULTY_TIPS，
+而不是 EmotionNavigator 生成的内容
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .emotion_analyzer import EMOTION_INDEX, EMOTION_LABELS, EMOTION_MAPPING
+
+# 各情感在效价-唤醒度平面上的位置（效价, 唤醒度），取值范围[-1, 1]
+EMOTION_COORDINATES: Dict[str, Tuple[float, float]] = {
+    'joy': (0.8, 0.5),
+    'sadness': (-0.7, -0.4),
+    'anger': (-0.6, 0.8),
+    'fear': (-0.7, 0.6),
+    'surprise': (0.2, 0.8),
+    'disgust': (-0.6, 0.3),
+    'neutral': (0.0, 0.0),
+    'anxiety': (-0.5, 0.6),
+    'calm': (0.4, -0.6),
+    'excitement': (0.7, 0.9),
+    'frustration': (-0.5, 0.4),
+    'contentment': (0.7, -0.3),
+    'loneliness': (-0.6, -0.5),
+    'love': (0.8, 0.2),
+    'hope': (0.5, 0.2)
+}
+
+# 所有情感都可以直接过渡到的中转情感
+HUB_EMOTIONS = ('neutral', 'calm')
+
+# 到达各情感的练习：(类型, 内容)，第一项为默认练习
+ACTIVITIES: Dict[str, Sequence[Tuple[str, str]]] = {
+    'joy': (('social', '和朋友分享一件今天的好事'), ('creative', '听一首让你想跟着哼唱的歌')),
+    'sadness': (('reflection', '允许自己难过，写下此刻的感受'), ('social', '向信任的人说说发生了什么')),
+    'anger': (('movement', '快走十分钟释放身体里的紧绷'), ('reflection', '写下让你生气的事和背后的需求')),
+    'fear': (('reflection', '说出担心的具体事情'), ('breathing', '用4-7-8呼吸稳定身体')),
+    'surprise': (('reflection', '记录这件意外的事带来的新信息'), ('social', '和身边的人聊聊这份意外')),
+    'disgust': (('reflection', '辨认让你不适的边界'), ('movement', '离开当前环境走一走')),
+    'neutral': (('breathing', '做三次缓慢的深呼吸，回到当下'), ('reflection', '觉察此刻身体的感受')),
+    'anxiety': (('reflection', '把担心的事情逐条写下来'), ('breathing', '做两分钟方块呼吸')),
+    'calm': (('breathing', '进行5分钟腹式呼吸'), ('reflection', '做一次身体扫描冥想')),
+    'excitement': (('movement', '做一段喜欢的运动'), ('creative', '为期待的事情做个小计划')),
+    'frustration': (('reflection', '把卡住的问题拆成更小的一步'), ('movement', '起身活动一下换换思路')),
+    'contentment': (('reflection', '写下三件值得感恩的小事'), ('creative', '为自己泡一杯喜欢的饮品')),
+    'loneliness': (('social', '给一位老朋友发条消息'), ('creative', '去常去的咖啡馆或公园坐一坐')),
+    'love': (('social', '对重要的人表达一次感谢'), ('reflection', '回忆一段被关心的经历')),
+    'hope': (('reflection', '想象问题解决后的样子'), ('creative', '列出接下来可以尝试的一件小事'))
+}
+
+# 偏好节奏对预计时间的缩放
+PACE_SCALES = {'slow': 1.5, 'normal': 1.0, 'fast': 0.75}
+
+# 按总耗时（分钟）划分难度
+DIFFICULTY_THRESHOLDS = ((20.0, 'easy'), (45.0, 'medium'))
+
+DIFFICULTY_TIPS = {
+    'easy': ['按自己的节奏进行即可'],
+    'medium': ['每一步之间留出休息的时间', '感到吃力时可以先停在中间的情感'],
+    'hard': ['这段转变需要时间，不必一次完成', '可以分几天逐步练习', '需要时寻求身边人的支持']
+}
+
+
+@dataclass
+class NavigationPlan:
+    """导航结果，字段与NavigateResponse一致"""
+    path: List[Dict[str, Any]]
+    estimatedTime: int
+    difficulty: str
+    tips: Optional[List[str]] = None
+
+    def copy(self) -> "NavigationPlan":
+        """复制路径步骤和建议列表，调用方修改副本不会影响缓存"""
+        return NavigationPlan(
+            path=[dict(step) for step in self.path],
+            estimatedTime=self.estimatedTime,
+            difficulty=self.difficulty,
+            tips=list(self.tips) if self.tips is not None else None
+        )
+
+
+class EmotionTransitionGraph:
+    """预计算全部情感对最短路径的转移图"""
+
+    def __init__(self, neighbors: int = 3, cache_size: int = 4096):
+        self.labels = EMOTION_LABELS
+        self.cache_size = cache_size
+
+        costs = self._build_costs(neighbors)
+        self.minutes, self._next = self._floyd_warshall(costs)
+        self._edge_costs = costs
+
+        # (当前, 目标) -> 每一步的(情感ID, 分钟)
+        self._routes: Dict[Tuple[int, int], Tuple[Tuple[int, float], ...]] = {}
+        n = len(self.labels)
+        for i in range(n):
+            for j in range(n):
+                route = self._reconstruct(i, j)
+                if route is not None:
+                    self._routes[(i, j)] = route
+
+        self._cache: "OrderedDict[tuple, NavigationPlan]" = OrderedDict()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'unknown': 0,
+        }
+
+    def _build_costs(self, neighbors: int) -> np.ndarray:
+        """
+        构建边权矩阵（分钟），无边为inf
+
+        每个情感连接效价-唤醒度平面上最近的若干情感以及中转情感；
+        距离越远耗时越长，提升效价比降低效价更费力
+        """
+        n = len(self.labels)
+        coords = np.array([EMOTION_COORDINATES[label] for label in self.labels], dtype=np.float64)
+        distance = np.linalg.norm(coords[:, None, :] - coords[None, :, :], axis=2)
+        valence_gain = np.maximum(coords[None, :, 0] - coords[:, None, 0], 0.0)
+        weights = 5.0 + 15.0 * distance + 10.0 * valence_gain
+
+        adjacency = np.zeros((n, n), dtype=bool)
+        nearest = np.argsort(distance, axis=1)[:, 1:neighbors + 1]
+        adjacency[np.arange(n)[:, None], nearest] = True
+        adjacency |= adjacency.T
+        for hub in HUB_EMOTIONS:
+            adjacency[:, EMOTION_INDEX[hub]] = True
+            adjacency[EMOTION_INDEX[hub], :] = True
+        np.fill_diagonal(adjacency, False)
+
+        costs = np.where(adjacency, weights, np.inf)
+        np.fill_diagonal(costs, 0.0)
+        return costs
+
+    @staticmethod
+    def _floyd_warshall(costs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """返回最短耗时矩阵和下一跳矩阵（不可达为-1）"""
+        n = len(costs)
+        dist = costs.copy()
+        next_hop = np.where(np.isfinite(costs), np.arange(n)[None, :], -1)
+        for k in range(n):
+            through = dist[:, k, None] + dist[None, k, :]
+            shorter = through < dist
+            dist = np.where(shorter, through, dist)
+            next_hop = np.where(shorter, next_hop[:, k, None], next_hop)
+        return dist, next_hop
+
+    def _reconstruct(self, i: int, j: int) -> Optional[Tuple[Tuple[int, float], ...]]:
+        if self._next[i, j] < 0:
+            return None
+        steps = []
+        current = i
+        while current != j:
+            hop = int(self._next[current, j])
+            steps.append((hop, float(self._edge_costs[current, hop])))
+            current = hop
+        return tuple(steps)
+
+    def get_path(
+        self,
+        current_emotion: str,
+        target_emotion: str,
+        preferences: Optional[Dict[str, Any]] = None
+    ) -> Optional[NavigationPlan]:
+        """
+        查询导航路径
+
+        Returns:
+            导航结果（缓存条目的副本）；情感不在图中或不可达时返回None，由调用方回退到导航模型
+        """
+        i = EMOTION_INDEX.get(current_emotion)
+        j = EMOTION_INDEX.get(target_emotion)
+        route = self._routes.get((i, j)) if i is not None and j is not None else None
+        if route is None:
+            self._stats['unknown'] += 1
+            return None
+
+        pace, activity_types = _normalize_preferences(preferences)
+        key = (i, j, pace, activity_types)
+
+        plan = self._cache.get(key)
+        if plan is not None:
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return plan.copy()
+
+        self._stats['misses'] += 1
+        plan = self._build_plan(i, route, key[2], key[3])
+        self._cache[key] = plan
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return plan.copy()
+
+    def _build_plan(
+        self,
+        current_id: int,
+        route: Tuple[Tuple[int, float], ...],
+        pace: str,
+        activity_types: Tuple[str, ...]
+    ) -> NavigationPlan:
+        """在预计算路径上按偏好选择练习并缩放时间"""
+        scale = PACE_SCALES[pace]
+        total = sum(minutes for _, minutes in route)
+
+        if not route:
+            # 已处于目标情感：给出一步巩固练习
+            label = self.labels[current_id]
+            _, activity = self._choose_activity(label, activity_types)
+            path = [{
+                'step': 1,
+                'from': label,
+                'emotion': label,
+                'emotionName': EMOTION_MAPPING[label],
+                'activity': activity,
+                'duration': max(1, round(5 * scale))
+            }]
+            return NavigationPlan(path=path, estimatedTime=path[0]['duration'],
+                                  difficulty='easy', tips=list(DIFFICULTY_TIPS['easy']))
+
+        path = []
+        previous = self.labels[current_id]
+        for step, (emotion_id, minutes) in enumerate(route, start=1):
+            label = self.labels[emotion_id]
+            _, activity = self._choose_activity(label, activity_types)
+            path.append({
+                'step': step,
+                'from': previous,
+                'emotion': label,
+                'emotionName': EMOTION_MAPPING[label],
+                'activity': activity,
+                'duration': max(1, round(minutes * scale))
+            })
+            previous = label
+
+        difficulty = 'hard'
+        for threshold, level in DIFFICULTY_THRESHOLDS:
+            if total <= threshold:
+                difficulty = level
+                break
+
+        return NavigationPlan(
+            path=path,
+            estimatedTime=max(1, sum(item['duration'] for item in path)),
+            difficulty=difficulty,
+            tips=list(DIFFICULTY_TIPS[difficulty])
+        )
+
+    @staticmethod
+    def _choose_activity(label: str, activity_types: Sequence[str]) -> Tuple[str, str]:
+        """优先选择用户偏好类型的练习"""
+        options = ACTIVITIES[label]
+        for preferred in activity_types:
+            for option in options:
+                if option[0] == preferred:
+                    return option
+        return options[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取路径与缓存统计"""
+        return {
+            **self._stats,
+            'routes': len(self._routes),
+            'cache_size': len(self._cache),
+            'max_cache_size': self.cache_size,
+        }
+
+
+def _normalize_preferences(preferences: Any) -> Tuple[str, Tuple[str, ...]]:
+    """从用户偏好中取出节奏和练习类型，忽略类型不符的取值（保证可作为缓存键）"""
+    if not isinstance(preferences, dict):
+        return 'normal', ()
+
+    pace = preferences.get('pace')
+    if not isinstance(pace, str) or pace not in PACE_SCALES:
+        pace = 'normal'
+
+    activity_types = preferences.get('activityTypes')
+    if isinstance(activity_types, str):
+        activity_types = (activity_types,)
+    elif isinstance(activity_types, (list, tuple)):
+        activity_types = tuple(item for item in activity_types if isinstance(item, str))
+    else:
+        activity_types = ()
+    return pace, activity_types
@@ -0,0 +1,194 @@
+"""
+Aurora准入控制
+按用户令牌桶限流，全局并发上限加有界等待队列，超出部分在占用模型前直接拒绝
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import structlog
+
+from .metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_LENGTH,
+    ADMISSION_REJECTIONS,
+    ADMISSION_WAIT
+)
+
+logger = structlog.get_logger()
+
+
+class AdmissionRejected(Exception):
+    """请求未获准入"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """用户级令牌桶 + 全局并发上限 + 有界FIFO等待队列"""
+
+    def __init__(
+        self,
+        user_rate: float = 2.0,
+        user_burst: int = 10,
+        max_concurrency: int = 64,
+        max_queue: int = 128,
+        queue_timeout: float = 2.0,
+        max_tracked_users: int = 100000
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency必须大于0")
+        if user_rate <= 0:
+            raise ValueError("user_rate必须大于0")
+        if user_burst < 1:
+            raise ValueError("user_burst必须大于0")
+
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_tracked_users = max_tracked_users
+
+        # userId -> [剩余令牌, 上次补充时间]
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # 单个请求占用并发槽位时长的滑动平均，用于估算Retry-After
+        self._avg_hold = 0.5
+
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "rate_limited": 0,
+            "queue_full": 0,
+            "queue_timeout": 0,
+        }
+        self._total_wait = 0.0
+
+    async def acquire(self, user_id: Optional[str]):
+        """申请准入；被拒绝时抛出AdmissionRejected"""
+        if user_id:
+            self._take_token(user_id)
+
+        if self._active < self.max_concurrency and not self._waiters:
+            self._grant(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            # 因服务繁忙被拒绝的请求不消耗用户配额
+            self._refund_token(user_id)
+            self._reject(503, "queue_full", self._estimate_wait(len(self._waiters)))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        ADMISSION_QUEUE_LENGTH.set(len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 超时与被唤醒同时发生：槽位已转交，归还给下一个等待者
+                self._active -= 1
+                self._wake_next()
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._refund_token(user_id)
+            self._reject(503, "queue_timeout", self._estimate_wait(len(self._waiters)))
+
+        # 槽位由release直接转交，active计数已保持
+        self._record_wait(time.monotonic() - started)
+
+    def release(self, held_seconds: Optional[float] = None):
+        """释放并发槽位，优先转交给队首等待者"""
+        if held_seconds is not None:
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * held_seconds
+        self._active -= 1
+        self._wake_next()
+        ADMISSION_ACTIVE.set(self._active)
+
+    def _wake_next(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._active += 1
+                waiter.set_result(None)
+                break
+        ADMISSION_QUEUE_LENGTH.set(len(self._waiters))
+
+    def _remove_waiter(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        ADMISSION_QUEUE_LENGTH.set(len(self._waiters))
+
+    def _grant(self, waited: float):
+        self._active += 1
+        self._record_wait(waited)
+        ADMISSION_ACTIVE.set(self._active)
+
+    def _record_wait(self, waited: float):
+        self._stats["admitted"] += 1
+        self._total_wait += waited
+        ADMISSION_WAIT.observe(waited)
+
+    def _take_token(self, user_id: str):
+        """从用户令牌桶中取一个令牌，不足时按补充速率计算Retry-After"""
+        now = time.monotonic()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = [float(self.user_burst), now]
+            while len(self._buckets) > self.max_tracked_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket[0] = min(self.user_burst, bucket[0] + (now - bucket[1]) * self.user_rate)
+            bucket[1] = now
+
+        if bucket[0] < 1.0:
+            self._reject(429, "rate_limited", (1.0 - bucket[0]) / self.user_rate)
+        bucket[0] -= 1.0
+
+    def _refund_token(self, user_id: Optional[str]):
+        """归还acquire时取走的令牌"""
+        bucket = self._buckets.get(user_id) if user_id else None
+        if bucket is not None:
+            bucket[0] = min(self.user_burst, bucket[0] + 1.0)
+
+    def _estimate_wait(self, queue_length: int) -> float:
+        return self._avg_hold * (queue_length + 1) / self.max_concurrency
+
+    def _reject(self, status_code: int, reason: str, wait_seconds: float):
+        self._stats[reason] += 1
+        ADMISSION_REJECTIONS.labels(reason=reason).inc()
+        retry_after = max(1, math.ceil(wait_seconds))
+        logger.warning("请求未获准入", reason=reason, retryAfter=retry_after,
+                      active=self._active, queueLength=len(self._waiters))
+        raise AdmissionRejected(status_code, reason, retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取准入、排队与拒绝统计"""
+        admitted = self._stats["admitted"]
+        return {
+            **self._stats,
+            "active": self._active,
+            "queue_length": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_wait_ms": round(self._total_wait / admitted * 1000, 3) if admitted else 0.0,
+            "avg_hold_ms": round(self._avg_hold * 1000, 3),
+            "tracked_users": len(self._buckets),
+        }
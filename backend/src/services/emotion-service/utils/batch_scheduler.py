@@ -0,0 +1,214 @@
+"""
+Aurora情感分析微批调度器
+把并发到达的单条analyze请求在几毫秒内聚合成一批，统一交给文本模型处理
+"""
+
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class _PendingRequest:
+    """等待被批处理的单条请求"""
+
+    __slots__ = ("text", "context", "user_id", "future", "enqueued_at")
+
+    def __init__(
+        self,
+        text: str,
+        context: Optional[Dict[str, Any]],
+        user_id: Optional[str],
+        future: asyncio.Future
+    ):
+        self.text = text
+        self.context = context
+        self.user_id = user_id
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """跨请求的动态微批调度器"""
+
+    def __init__(
+        self,
+        analyzer,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        stats_window: int = 1024
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size必须大于0")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms不能为负数")
+
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        # 调度循环正在收集中的批次，停止时需要一并处理
+        self._collecting: Optional[List[_PendingRequest]] = None
+
+        # 统计信息
+        self._batch_count = 0
+        self._item_count = 0
+        self._batch_sizes: Counter = Counter()
+        self._recent_waits: Deque[float] = deque(maxlen=stats_window)
+        self._recent_batch_latency: Deque[float] = deque(maxlen=stats_window)
+
+    async def start(self):
+        """启动调度循环"""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+        logger.info("微批调度器已启动",
+                   maxBatchSize=self.max_batch_size,
+                   maxWaitMs=self.max_wait * 1000)
+
+    async def stop(self):
+        """停止调度循环，正在收集的批次和队列中剩余的请求会先处理完"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        # 此后新的请求直接走单条路径
+        self._worker = None
+
+        pending = self._collecting or []
+        self._collecting = None
+        try:
+            while pending or not self._queue.empty():
+                pending.extend(self._drain(self._queue.qsize()))
+                batch, pending = pending[:self.max_batch_size], pending[self.max_batch_size:]
+                await self._dispatch(batch)
+            if self._inflight:
+                await asyncio.gather(*self._inflight, return_exceptions=True)
+        finally:
+            # 停止过程被中断时，未处理的请求以异常结束，避免调用方永远等待
+            for req in pending + self._drain(self._queue.qsize()):
+                if not req.future.done():
+                    req.future.set_exception(RuntimeError("微批调度器已停止"))
+        logger.info("微批调度器已停止")
+
+    async def analyze(
+        self,
+        text: str,
+        context: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
+    ):
+        """提交一条分析请求并等待它所在批次的结果"""
+        if self._worker is None:
+            # 未启动时直接走单条路径
+            return await self.analyzer.analyze(text=text, context=context, user_id=user_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_PendingRequest(text, context, user_id, future))
+        return await future
+
+    async def _run(self):
+        """调度主循环：攒批后异步派发，不阻塞下一批的收集"""
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            batch = self._collecting = [first]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    batch.extend(self._drain(self.max_batch_size - len(batch)))
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self._collecting = None
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    def _drain(self, limit: int) -> List[_PendingRequest]:
+        """非阻塞地取出队列中已有的请求"""
+        items = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _dispatch(self, batch: List[_PendingRequest]):
+        """执行一批请求并把结果分发给各自的调用方"""
+        # 调用方已取消的请求不再占用模型
+        batch = [req for req in batch if not req.future.done()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for req in batch:
+            self._recent_waits.append(started - req.enqueued_at)
+        self._batch_count += 1
+        self._item_count += len(batch)
+        self._batch_sizes[len(batch)] += 1
+
+        try:
+            results = await self.analyzer.analyze_batch_items(
+                [(req.text, req.context, req.user_id) for req in batch]
+            )
+        except Exception as e:
+            logger.error("微批分析失败", error=str(e), batchSize=len(batch))
+            results = [e] * len(batch)
+
+        self._recent_batch_latency.append(time.perf_counter() - started)
+
+        for req, result in zip(batch, results):
+            if req.future.done():
+                continue
+            if isinstance(result, BaseException):
+                req.future.set_exception(result)
+            else:
+                req.future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计：队列深度、批大小分布和排队等待时间"""
+        waits_ms = sorted(w * 1000 for w in self._recent_waits)
+        latency_ms = sorted(w * 1000 for w in self._recent_batch_latency)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "inflight_batches": len(self._inflight),
+            "batches": self._batch_count,
+            "items": self._item_count,
+            "avg_batch_size": self._item_count / self._batch_count if self._batch_count else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "wait_ms": _percentiles(waits_ms),
+            "batch_latency_ms": _percentiles(latency_ms),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def _percentiles(sorted_values: List[float]) -> Dict[str, float]:
+    """计算已排序样本的p50/p95/p99"""
+    if not sorted_values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def pick(q: float) -> float:
+        index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+        return round(sorted_values[index], 3)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(sorted_values[-1], 3),
+    }
@@ -0,0 +1,149 @@
+"""
+Aurora对话流水线
+情感分析与回复生成重叠执行：先以预测情感启动生成，分析结果到达后再决定沿用或重启
+
+推测生成使用的情感上下文只有情感类别和强度是预测值，其余字段为占位：
+confidence为0、reasoning为固定说明、没有次要情感。只有当真实结果的情感类别和强度等级
+都与预测一致时才沿用推测生成的回复；此时回复与以真实结果生成的回复相比，
+可能不同的只有具体强度数值、confidence、reasoning和secondary_emotions所带来的差异
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import structlog
+
+from ..models.emotion_analyzer import EmotionResult
+
+logger = structlog.get_logger()
+
+
+class SpeculativeChatPipeline:
+    """基于预测情感的推测式对话流水线"""
+
+    def __init__(
+        self,
+        known_emotions=(),
+        intensity_level: Optional[Callable[[float], str]] = None,
+        max_tracked_users: int = 10000
+    ):
+        self.known_emotions = frozenset(known_emotions)
+        # 把强度映射为等级，预测与真实结果等级相同才沿用推测回复；未提供时只比较情感类别
+        self.intensity_level = intensity_level
+        self.max_tracked_users = max_tracked_users
+
+        # 用户最近一次检测到的(情感, 强度)，作为下一轮的预测依据
+        self._last_emotions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+        self._stats = {
+            "kept": 0,
+            "restarted": 0,
+            "failed": 0,
+        }
+
+    def guess_emotion(
+        self,
+        user_id: Optional[str],
+        context: Optional[Dict[str, Any]]
+    ) -> Tuple[str, float]:
+        """预测当前情感和强度：客户端提供的当前情感 > 该用户上一轮情感 > neutral"""
+        last = None
+        if user_id and user_id in self._last_emotions:
+            self._last_emotions.move_to_end(user_id)
+            last = self._last_emotions[user_id]
+        hinted = (context or {}).get("current_emotion")
+        if isinstance(hinted, str) and (not self.known_emotions or hinted in self.known_emotions):
+            return hinted, last[1] if last and last[0] == hinted else 0.5
+        if last is not None:
+            return last
+        return "neutral", 0.5
+
+    def remember(self, user_id: Optional[str], emotion: str, intensity: float = 0.5):
+        """记录用户最近一次情感，超出容量时淘汰最久未活跃的用户"""
+        if not user_id:
+            return
+        self._last_emotions[user_id] = (emotion, intensity)
+        self._last_emotions.move_to_end(user_id)
+        while len(self._last_emotions) > self.max_tracked_users:
+            self._last_emotions.popitem(last=False)
+
+    async def run(
+        self,
+        user_id: Optional[str],
+        context: Optional[Dict[str, Any]],
+        analyze: Callable[[], Awaitable[EmotionResult]],
+        generate: Callable[[EmotionResult], Awaitable[Any]]
+    ) -> Tuple[EmotionResult, Any]:
+        """
+        并行执行情感分析与回复生成
+
+        Args:
+            user_id: 用户ID
+            context: 请求上下文
+            analyze: 执行情感分析的协程工厂
+            generate: 以情感上下文生成回复的协程工厂
+
+        Returns:
+            (真实情感分析结果, 回复生成结果)；沿用推测回复时，回复基于预测的情感上下文生成（见模块说明）
+        """
+        emotion, intensity = self.guess_emotion(user_id, context)
+        provisional = EmotionResult(
+            emotion=emotion,
+            intensity=intensity,
+            confidence=0.0,
+            reasoning="预测情感（分析进行中）",
+            metadata={"provisional": True}
+        )
+
+        analysis_task = asyncio.create_task(analyze())
+        generation_task = asyncio.create_task(generate(provisional))
+        # 被丢弃的推测生成可能以异常结束，提前取回避免未处理异常告警
+        generation_task.add_done_callback(
+            lambda task: task.cancelled() or task.exception()
+        )
+
+        try:
+            try:
+                emotion_result = await analysis_task
+            except BaseException:
+                self._stats["failed"] += 1
+                raise
+
+            self.remember(user_id, emotion_result.emotion, emotion_result.intensity)
+
+            if self._matches(provisional, emotion_result):
+                self._stats["kept"] += 1
+                return emotion_result, await generation_task
+
+            # 预测失败：丢弃推测生成，以真实情感重新生成
+            generation_task.cancel()
+            self._stats["restarted"] += 1
+            logger.debug("推测情感与分析结果不一致，重新生成回复",
+                        userId=user_id,
+                        provisional=provisional.emotion,
+                        actual=emotion_result.emotion)
+            return emotion_result, await generate(emotion_result)
+        finally:
+            # 外层请求被取消或出错时，不留下仍在运行的分析和推测生成
+            for task in (analysis_task, generation_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(analysis_task, generation_task, return_exceptions=True)
+
+    def _matches(self, provisional: EmotionResult, actual: EmotionResult) -> bool:
+        """真实结果的情感类别与强度等级都与预测一致时沿用推测回复"""
+        if actual.emotion != provisional.emotion:
+            return False
+        if self.intensity_level is None:
+            return True
+        return self.intensity_level(actual.intensity) == self.intensity_level(provisional.intensity)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取推测沿用/重启次数"""
+        decided = self._stats["kept"] + self._stats["restarted"]
+        return {
+            **self._stats,
+            "keep_ratio": self._stats["kept"] / decided if decided else 0.0,
+            "tracked_users": len(self._last_emotions),
+        }
@@ -0,0 +1,342 @@
+"""
+Aurora情感汇总
+在保存分析结果时增量维护每个用户按小时/按天的情感统计，/status直接读取汇总而不扫描历史记录
+
+汇总保存在进程内存中，按服务端时间分桶（不信任客户端时间戳）：启动时由调用方读取保留期内的
+数据库记录全量构建，之后定期只读取上次读取以来（按小时对齐）的记录，替换对应的小时桶并修正天桶，
+以纳入其他副本写入的记录；读取期间本进程新记录的结果会合并回汇总。
+时间窗口未被完整覆盖时由调用方回退到数据库查询
+"""
+
+import bisect
+import math
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+HOUR = 3600
+DAY = 86400
+
+# 时间范围 -> (桶粒度秒数, 桶数量)
+TIMEFRAMES: Dict[str, Tuple[int, int]] = {
+    "day": (HOUR, 24),
+    "week": (DAY, 7),
+    "month": (DAY, 30),
+}
+
+# 每个用户保留的最近分析条数，与数据库查询返回的emotionHistory条数一致
+RECENT_LIMIT = 50
+
+# 增量读取时向前多读的秒数，覆盖其他副本保存时间与提交时间之间的差距
+RELOAD_OVERLAP = 60
+
+
+class _Bucket:
+    """单个时间桶：情感计数、强度和与平方和"""
+
+    __slots__ = ("count", "intensity_sum", "intensity_sq_sum", "emotions")
+
+    def __init__(self):
+        self.count = 0
+        self.intensity_sum = 0.0
+        self.intensity_sq_sum = 0.0
+        self.emotions: Dict[str, int] = {}
+
+    def add(self, emotion: str, intensity: float):
+        self.count += 1
+        self.intensity_sum += intensity
+        self.intensity_sq_sum += intensity * intensity
+        self.emotions[emotion] = self.emotions.get(emotion, 0) + 1
+
+    def subtract(self, other: "_Bucket"):
+        self.count -= other.count
+        self.intensity_sum -= other.intensity_sum
+        self.intensity_sq_sum -= other.intensity_sq_sum
+        for emotion, n in other.emotions.items():
+            remaining = self.emotions.get(emotion, 0) - n
+            if remaining > 0:
+                self.emotions[emotion] = remaining
+            else:
+                self.emotions.pop(emotion, None)
+
+
+class _UserRollup:
+    """单个用户的小时桶、天桶和最近若干条分析（按时间排序）"""
+
+    __slots__ = ("hourly", "daily", "recent", "tracked_since")
+
+    def __init__(self, tracked_since: float):
+        self.hourly: Dict[int, _Bucket] = {}
+        self.daily: Dict[int, _Bucket] = {}
+        self.recent: List[Tuple[float, str, float]] = []
+        self.tracked_since = tracked_since
+
+
+class EmotionRollupStore:
+    """按用户增量维护的情感汇总，超出容量时淘汰最久未活跃的用户"""
+
+    def __init__(
+        self,
+        max_users: int = 100000,
+        hourly_retention: int = 48,
+        daily_retention: int = 35
+    ):
+        self.max_users = max_users
+        self.hourly_retention = hourly_retention
+        self.daily_retention = daily_retention
+        self.started_at = time.time()
+
+        self._users: "OrderedDict[str, _UserRollup]" = OrderedDict()
+        self._evictions = 0
+        self._stats = {
+            "recorded": 0,
+            "served": 0,
+            "not_covered": 0,
+            "loads": 0,
+            "incremental_loads": 0,
+            "loaded_records": 0,
+        }
+        self.last_loaded_at: Optional[float] = None
+
+        # 进行中的读取：(读取起点, 是否全量, 开始时刻)，以及读取期间记录的分析
+        self._pending_load: Optional[Tuple[float, bool, float]] = None
+        self._journal: Optional[List[Tuple[str, str, float, float]]] = None
+
+    @property
+    def retention_seconds(self) -> int:
+        """全量构建汇总时需要从数据库读取的时间范围"""
+        return max(self.hourly_retention * HOUR, self.daily_retention * DAY)
+
+    def begin_load(self) -> float:
+        """
+        开始一次从数据库读取，返回需要读取的起始时刻（按服务端保存时间）
+
+        首次读取或距上次读取超出小时桶保留期时全量读取保留期内的记录，
+        否则只读取上次读取以来的记录；调用方读取完成后调用load，失败时调用abort_load
+        """
+        now = time.time()
+        full = (
+            self.last_loaded_at is None
+            or self.last_loaded_at - RELOAD_OVERLAP < now - self.hourly_retention * HOUR
+        )
+        if full:
+            since = now - self.retention_seconds
+        else:
+            since = (self.last_loaded_at - RELOAD_OVERLAP) // HOUR * HOUR
+        self._pending_load = (since, full, now)
+        self._journal = []
+        return since
+
+    def abort_load(self):
+        """放弃进行中的读取，汇总保持不变"""
+        self._pending_load = None
+        self._journal = None
+
+    def load(self, records: Iterable[Tuple[str, str, float, Any]]):
+        """
+        合并begin_load之后从数据库读取的记录
+
+        Args:
+            records: (用户ID, 情感, 强度, 服务端保存时间) 序列，时间可为ISO字符串、datetime或秒数
+        """
+        if self._pending_load is None:
+            raise RuntimeError("load之前需要先调用begin_load")
+        (since, full, started), self._pending_load = self._pending_load, None
+        journal, self._journal = self._journal or [], None
+
+        if full:
+            self._users = OrderedDict()
+            self._evictions = 0
+            self.started_at = since
+        else:
+            # 读取起点之后的桶整体以数据库为准
+            cutoff_hour = int(since // HOUR)
+            for rollup in self._users.values():
+                _drop_since(rollup, cutoff_hour)
+
+        now = time.time()
+        loaded = Counter()
+        count = 0
+        for user_id, emotion, intensity, timestamp in records:
+            ts = min(_parse_timestamp(timestamp), now)
+            if ts < since:
+                continue
+            self._apply(user_id, emotion, float(intensity), ts, now)
+            loaded[(user_id, emotion, float(intensity))] += 1
+            count += 1
+
+        # 读取期间本进程记录的分析：已出现在读取结果中的不重复计入
+        for user_id, emotion, intensity, ts in journal:
+            key = (user_id, emotion, intensity)
+            if loaded[key] > 0:
+                loaded[key] -= 1
+                continue
+            self._apply(user_id, emotion, intensity, ts, now)
+
+        self.last_loaded_at = started
+        self._stats["loads"] += 1
+        if not full:
+            self._stats["incremental_loads"] += 1
+        self._stats["loaded_records"] += count
+
+    def record(self, user_id: str, emotion: str, intensity: float):
+        """按当前服务端时间记录一条分析结果"""
+        now = time.time()
+        intensity = float(intensity)
+        self._apply(user_id, emotion, intensity, now, now)
+        if self._journal is not None:
+            self._journal.append((user_id, emotion, intensity, now))
+        self._stats["recorded"] += 1
+
+    def _apply(self, user_id: str, emotion: str, intensity: float, ts: float, now: float):
+        """把一条分析计入用户的桶，并按服务端当前时间清理过期的桶"""
+        if ts < now - self.retention_seconds:
+            return
+
+        rollup = self._users.get(user_id)
+        if rollup is None:
+            # 曾有用户被淘汰后，新建的汇总只能从此刻起视为完整
+            since = self.started_at if self._evictions == 0 else now
+            rollup = self._users[user_id] = _UserRollup(since)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._evictions += 1
+        else:
+            self._users.move_to_end(user_id)
+
+        _bucket(rollup.hourly, int(ts // HOUR)).add(emotion, intensity)
+        _bucket(rollup.daily, int(ts // DAY)).add(emotion, intensity)
+
+        bisect.insort(rollup.recent, (ts, emotion, intensity))
+        if len(rollup.recent) > RECENT_LIMIT:
+            del rollup.recent[0]
+
+        _prune(rollup.hourly, int(now // HOUR) - self.hourly_retention)
+        _prune(rollup.daily, int(now // DAY) - self.daily_retention)
+
+    def get_status(self, user_id: str, timeframe: str = "day") -> Optional[Dict[str, Any]]:
+        """
+        从汇总生成情感状态，字段与数据库查询结果一致
+
+        Returns:
+            状态数据；未知时间范围或窗口未被汇总完整覆盖时返回None
+        """
+        spec = TIMEFRAMES.get(timeframe)
+        if spec is None:
+            return None
+        width, slots = spec
+
+        now = time.time()
+        current = int(now // width)
+        first = current - slots + 1
+        rollup = self._users.get(user_id)
+        tracked_since = rollup.tracked_since if rollup else (
+            self.started_at if self._evictions == 0 else now
+        )
+        if first * width < tracked_since:
+            self._stats["not_covered"] += 1
+            return None
+
+        buckets = (rollup.hourly if width == HOUR else rollup.daily) if rollup else {}
+
+        periods: List[Dict[str, Any]] = []
+        emotion_counts: Dict[str, int] = {}
+        count = 0
+        intensity_sum = 0.0
+        intensity_sq_sum = 0.0
+        for index in range(first, current + 1):
+            bucket = buckets.get(index)
+            if bucket is None or bucket.count <= 0:
+                continue
+            count += bucket.count
+            intensity_sum += bucket.intensity_sum
+            intensity_sq_sum += bucket.intensity_sq_sum
+            for emotion, n in bucket.emotions.items():
+                emotion_counts[emotion] = emotion_counts.get(emotion, 0) + n
+            periods.append({
+                "period": _isoformat(index * width),
+                "count": bucket.count,
+                "emotions": dict(bucket.emotions),
+                "averageIntensity": bucket.intensity_sum / bucket.count,
+            })
+
+        window_start = first * width
+        recent = [item for item in rollup.recent if item[0] >= window_start] if rollup else []
+
+        self._stats["served"] += 1
+        if not count:
+            return {"currentEmotion": "neutral", "emotionHistory": [], "averageIntensity": 0.5}
+
+        mean = intensity_sum / count
+        variance = max(0.0, intensity_sq_sum / count - mean * mean)
+        return {
+            "currentEmotion": recent[-1][1] if recent else "neutral",
+            "emotionHistory": [
+                {"emotion": emotion, "intensity": intensity} for _, emotion, intensity in recent
+            ],
+            "averageIntensity": mean,
+            "emotionCounts": emotion_counts,
+            "totalAnalyses": count,
+            "intensityStdDev": math.sqrt(variance),
+            "emotionPeriods": periods,
+            "lastUpdated": _isoformat(recent[-1][0]) if recent else None,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取汇总命中与容量统计"""
+        return {
+            **self._stats,
+            "users": len(self._users),
+            "max_users": self.max_users,
+            "evictions": self._evictions,
+            "last_loaded_at": _isoformat(self.last_loaded_at) if self.last_loaded_at else None,
+        }
+
+
+def _bucket(buckets: Dict[int, _Bucket], index: int) -> _Bucket:
+    bucket = buckets.get(index)
+    if bucket is None:
+        bucket = buckets[index] = _Bucket()
+    return bucket
+
+
+def _prune(buckets: Dict[int, _Bucket], oldest: int):
+    for index in [i for i in buckets if i < oldest]:
+        del buckets[index]
+
+
+def _drop_since(rollup: _UserRollup, cutoff_hour: int):
+    """移除某小时起的全部记录：删除小时桶，并从所属天桶中扣除"""
+    for hour in [h for h in rollup.hourly if h >= cutoff_hour]:
+        bucket = rollup.hourly.pop(hour)
+        day_bucket = rollup.daily.get(hour * HOUR // DAY)
+        if day_bucket is not None:
+            day_bucket.subtract(bucket)
+            if day_bucket.count <= 0:
+                del rollup.daily[hour * HOUR // DAY]
+    cutoff = cutoff_hour * HOUR
+    rollup.recent = [item for item in rollup.recent if item[0] < cutoff]
+
+
+def _parse_timestamp(timestamp: Any) -> float:
+    """解析ISO格式时间戳（也接受datetime和秒数），缺失或无法解析时使用当前时间"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    if timestamp:
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except (TypeError, ValueError):
+            pass
+    return time.time()
+
+
+def _isoformat(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat().replace("+00:00", "Z")
@@ -0,0 +1,186 @@
+"""
+Aurora情感时间线
+在服务内存中保存每个用户最近的情感分析记录，供上下文分析和状态查询直接读取
+
+存储采用结构化数组（struct-of-arrays）：所有用户共享一组预分配的二维NumPy数组，
+每个用户占一行环形缓冲；行数由内存上限决定，满员时淘汰最久未活跃的用户
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# 每条记录占用的字节数：时间戳float64 + 情感ID uint8 + 强度float32 + 置信度float32
+_RECORD_BYTES = 8 + 1 + 4 + 4
+
+
+class EmotionTimelineStore:
+    """按用户的定长情感环形缓冲"""
+
+    def __init__(
+        self,
+        emotion_labels: Sequence[str],
+        capacity_per_user: int = 128,
+        max_users: int = 100000,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        if capacity_per_user < 1:
+            raise ValueError("capacity_per_user必须大于0")
+
+        self.emotion_labels = tuple(emotion_labels)
+        self.emotion_index = {emotion: i for i, emotion in enumerate(self.emotion_labels)}
+        self.capacity = capacity_per_user
+
+        # 用户数同时受配置和内存上限约束
+        # 每个用户另有写入位置和记录数两个int64
+        per_user_bytes = capacity_per_user * _RECORD_BYTES + 16
+        self.max_users = max(1, min(max_users, max_bytes // per_user_bytes))
+
+        shape = (self.max_users, self.capacity)
+        self._timestamps = np.zeros(shape, dtype=np.float64)
+        self._emotion_ids = np.zeros(shape, dtype=np.uint8)
+        self._intensities = np.zeros(shape, dtype=np.float32)
+        self._confidences = np.zeros(shape, dtype=np.float32)
+        # 每行的下一个写入位置和有效记录数
+        self._heads = np.zeros(self.max_users, dtype=np.int64)
+        self._counts = np.zeros(self.max_users, dtype=np.int64)
+
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free_slots: List[int] = list(range(self.max_users - 1, -1, -1))
+
+        self._stats = {
+            "appended": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return (self._timestamps.nbytes + self._emotion_ids.nbytes + self._intensities.nbytes
+                + self._confidences.nbytes + self._heads.nbytes + self._counts.nbytes)
+
+    def append(
+        self,
+        user_id: str,
+        emotion: str,
+        intensity: float,
+        confidence: float,
+        timestamp: Optional[float] = None
+    ):
+        """追加一条情感记录，缓冲满时覆盖该用户最旧的记录"""
+        emotion_id = self.emotion_index.get(emotion)
+        if emotion_id is None:
+            emotion_id = self.emotion_index.get("neutral", 0)
+
+        slot = self._slot_for(user_id)
+        head = self._heads[slot]
+        self._timestamps[slot, head] = time.time() if timestamp is None else timestamp
+        self._emotion_ids[slot, head] = emotion_id
+        self._intensities[slot, head] = intensity
+        self._confidences[slot, head] = confidence
+        self._heads[slot] = (head + 1) % self.capacity
+        if self._counts[slot] < self.capacity:
+            self._counts[slot] += 1
+        self._stats["appended"] += 1
+
+    def recent(self, user_id: str, limit: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        读取用户最近的记录（按时间从旧到新）
+
+        Returns:
+            timestamps/emotion_ids/intensities/confidences数组；无记录时返回None
+        """
+        slot = self._slots.get(user_id)
+        if slot is None:
+            return None
+        self._slots.move_to_end(user_id)
+
+        count = int(self._counts[slot])
+        if limit is not None:
+            count = min(count, limit)
+        if count == 0:
+            return None
+        order = (self._heads[slot] - count + np.arange(count)) % self.capacity
+        return {
+            "timestamps": self._timestamps[slot, order],
+            "emotion_ids": self._emotion_ids[slot, order],
+            "intensities": self._intensities[slot, order],
+            "confidences": self._confidences[slot, order],
+        }
+
+    def recent_records(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """以字典列表形式返回最近的记录，供接口直接输出"""
+        data = self.recent(user_id, limit)
+        if data is None:
+            return []
+        return [
+            {
+                "timestamp": float(ts),
+                "emotion": self.emotion_labels[emotion_id],
+                "intensity": round(float(intensity), 4),
+                "confidence": round(float(confidence), 4),
+            }
+            for ts, emotion_id, intensity, confidence in zip(
+                data["timestamps"], data["emotion_ids"],
+                data["intensities"], data["confidences"]
+            )
+        ]
+
+    def summary(self, user_id: str, window_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        统计用户近期情感：主导情感、平均强度和强度趋势
+
+        Args:
+            user_id: 用户ID
+            window_seconds: 只统计该时间窗口内的记录，None表示全部缓冲
+        """
+        data = self.recent(user_id)
+        if data is None:
+            return None
+
+        if window_seconds is not None:
+            mask = data["timestamps"] >= time.time() - window_seconds
+            if not mask.any():
+                return None
+            data = {name: values[mask] for name, values in data.items()}
+
+        intensities = data["intensities"]
+        counts = np.bincount(data["emotion_ids"], minlength=len(self.emotion_labels))
+        half = len(intensities) // 2
+        trend = float(intensities[half:].mean() - intensities[:half].mean()) if half else 0.0
+        return {
+            "count": int(len(intensities)),
+            "latest_emotion": self.emotion_labels[int(data["emotion_ids"][-1])],
+            "dominant_emotion": self.emotion_labels[int(counts.argmax())],
+            "average_intensity": float(intensities.mean()),
+            "intensity_trend": trend,
+            "last_timestamp": float(data["timestamps"][-1]),
+        }
+
+    def _slot_for(self, user_id: str) -> int:
+        """取得用户所在行，新用户分配空闲行，无空闲行时淘汰最久未活跃的用户"""
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._slots.move_to_end(user_id)
+            return slot
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self._stats["evictions"] += 1
+        self._heads[slot] = 0
+        self._counts[slot] = 0
+        self._slots[user_id] = slot
+        return slot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取用户数与内存占用统计"""
+        return {
+            **self._stats,
+            "users": len(self._slots),
+            "max_users": self.max_users,
+            "capacity_per_user": self.capacity,
+            "nbytes": self.nbytes,
+        }
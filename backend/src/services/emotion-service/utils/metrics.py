@@ -0,0 +1,149 @@
+"""
+Aurora情感服务Prometheus指标
+请求级与分析阶段级延迟直方图、并发请求数和模型加载耗时
+"""
+
+import time
+from typing import Dict, Iterable
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# 分析阶段覆盖从毫秒级文本推理到秒级多模态解码
+_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+REQUEST_LATENCY = Histogram(
+    "aurora_emotion_request_duration_seconds",
+    "情感服务HTTP请求处理耗时",
+    ["endpoint", "method", "status"],
+    buckets=_LATENCY_BUCKETS
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "aurora_emotion_requests_in_flight",
+    "正在处理中的HTTP请求数",
+    ["endpoint"]
+)
+
+STAGE_LATENCY = Histogram(
+    "aurora_emotion_stage_duration_seconds",
+    "情感分析各阶段耗时",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS
+)
+
+MODEL_LOAD_SECONDS = Gauge(
+    "aurora_emotion_model_load_seconds",
+    "模型加载耗时",
+    ["model"]
+)
+
+ADMISSION_ACTIVE = Gauge(
+    "aurora_emotion_admission_active",
+    "已获准入、正在占用并发槽位的请求数"
+)
+
+ADMISSION_QUEUE_LENGTH = Gauge(
+    "aurora_emotion_admission_queue_length",
+    "等待准入的请求数"
+)
+
+ADMISSION_WAIT = Histogram(
+    "aurora_emotion_admission_wait_seconds",
+    "请求获准入前的排队耗时",
+    buckets=_LATENCY_BUCKETS
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "aurora_emotion_admission_rejections_total",
+    "未获准入被拒绝的请求数",
+    ["reason"]
+)
+
+WRITE_BEHIND_BACKLOG = Gauge(
+    "aurora_emotion_write_behind_backlog",
+    "批量写回缓冲中等待写入的记录数",
+    ["buffer"]
+)
+
+WRITE_BEHIND_FLUSH_LATENCY = Histogram(
+    "aurora_emotion_write_behind_flush_duration_seconds",
+    "批量写回单个批次的写入耗时",
+    ["buffer"],
+    buckets=_LATENCY_BUCKETS
+)
+
+WRITE_BEHIND_FLUSH_FAILURES = Counter(
+    "aurora_emotion_write_behind_flush_failures_total",
+    "批量写回写入失败的批次数",
+    ["buffer"]
+)
+
+WRITE_BEHIND_DROPPED = Counter(
+    "aurora_emotion_write_behind_dropped_total",
+    "批量写回因缓冲已满或写入失败而丢弃的记录数",
+    ["buffer"]
+)
+
+# 预先解析各阶段的子指标，热路径上只做一次observe
+STAGES = ("text", "text_batch", "audio", "visual", "fusion", "result", "db_save")
+_STAGE_OBSERVERS = {stage: STAGE_LATENCY.labels(stage=stage).observe for stage in STAGES}
+
+
+def observe_stage(stage: str, seconds: float):
+    """记录单个分析阶段的耗时"""
+    _STAGE_OBSERVERS[stage](seconds)
+
+
+def record_model_load_timings(timings: Dict[str, float]):
+    """同步模型加载耗时到指标"""
+    for model, seconds in timings.items():
+        MODEL_LOAD_SECONDS.labels(model=model).set(seconds)
+
+
+def render_metrics():
+    """生成Prometheus文本格式的指标内容"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class PrometheusMiddleware:
+    """记录请求耗时与并发数的ASGI中间件"""
+
+    def __init__(self, app, tracked_paths: Iterable[str] = (), excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.tracked_paths = frozenset(tracked_paths)
+        self.excluded_paths = frozenset(excluded_paths)
+        self._in_flight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        # 未知路径统一归为other，避免标签基数失控
+        endpoint = scope["path"] if scope["path"] in self.tracked_paths else "other"
+        in_flight = self._in_flight.get(endpoint)
+        if in_flight is None:
+            in_flight = self._in_flight[endpoint] = REQUESTS_IN_FLIGHT.labels(endpoint=endpoint)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(
+                endpoint=endpoint,
+                method=scope["method"],
+                status=str(status_code)
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,101 @@
+"""
+Aurora模型加载器
+统一管理各模型的加载：每个模型只加载一次，相互独立的模型并行加载，少用的模型可延迟到首次使用
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Set
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class ModelLoader:
+    """幂等、并行、可延迟的模型加载器"""
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._lazy: Set[str] = set()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._loaded: Set[str] = set()
+        self._failed: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    def register(
+        self,
+        name: str,
+        load_fn: Callable[[], Awaitable[Any]],
+        lazy: bool = False
+    ):
+        """注册模型加载函数；lazy为True时首次使用才加载"""
+        if name in self._loaders:
+            raise ValueError(f"模型已注册: {name}")
+        self._loaders[name] = load_fn
+        if lazy:
+            self._lazy.add(name)
+
+    @property
+    def names(self) -> Iterable[str]:
+        return self._loaders.keys()
+
+    async def ensure(self, name: str):
+        """确保模型已加载；并发调用共享同一次加载"""
+        if name in self._loaded:
+            return
+        if name not in self._loaders:
+            raise KeyError(f"未注册的模型: {name}")
+
+        task = self._tasks.get(name)
+        if task is None:
+            task = asyncio.create_task(self._load(name))
+            self._tasks[name] = task
+        await asyncio.shield(task)
+
+    async def load_eager(self):
+        """并行加载所有非延迟模型"""
+        await asyncio.gather(*[
+            self.ensure(name) for name in self._loaders if name not in self._lazy
+        ])
+
+    async def load_all(self):
+        """并行加载全部模型（包括延迟模型）"""
+        await asyncio.gather(*[self.ensure(name) for name in self._loaders])
+
+    async def _load(self, name: str):
+        """执行单个模型的加载并记录耗时"""
+        started = time.perf_counter()
+        logger.info("开始加载模型", model=name, lazy=name in self._lazy)
+        try:
+            await self._loaders[name]()
+        except Exception as e:
+            # 加载失败后允许下次调用重试
+            self._tasks.pop(name, None)
+            self._failed[name] = str(e)
+            logger.error("模型加载失败", model=name, error=str(e))
+            raise
+
+        elapsed = time.perf_counter() - started
+        self.timings[name] = elapsed
+        self._loaded.add(name)
+        self._failed.pop(name, None)
+        logger.info("模型加载完成", model=name, seconds=round(elapsed, 3))
+
+    def is_loaded(self, *names: str) -> bool:
+        """指定模型是否都已加载完成"""
+        return all(name in self._loaded for name in names)
+
+    def status(self) -> Dict[str, str]:
+        """各模型的加载状态"""
+        states = {}
+        for name in self._loaders:
+            if name in self._loaded:
+                states[name] = "loaded"
+            elif name in self._failed:
+                states[name] = "failed"
+            elif name in self._tasks:
+                states[name] = "loading"
+            else:
+                states[name] = "deferred" if name in self._lazy else "pending"
+        return states
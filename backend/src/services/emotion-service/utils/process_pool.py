@@ -0,0 +1,150 @@
+"""
+Aurora音视频处理进程池
+把CPU密集的音频/视觉解码放到独立进程中执行，事件循环只等待future
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+# 工作进程内的全局状态：每个进程只加载一次模型
+_worker_processors: Dict[str, Any] = {}
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(processor_classes: Dict[str, type]):
+    """工作进程初始化：创建处理器并加载模型"""
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    for modality, processor_class in processor_classes.items():
+        processor = processor_class()
+        _worker_loop.run_until_complete(processor.load_models())
+        _worker_processors[modality] = processor
+
+
+def _warmup() -> int:
+    """确认工作进程已完成初始化"""
+    return len(_worker_processors)
+
+
+def _run_in_worker(modality: str, shm_name: str, size: int) -> Dict[str, Any]:
+    """在工作进程中从共享内存读取原始数据并执行分析"""
+    # 工作进程与主进程共用resource_tracker，共享内存段统一由主进程unlink
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:size]
+    try:
+        return _worker_loop.run_until_complete(
+            _worker_processors[modality].analyze(view)
+        )
+    finally:
+        try:
+            view.release()
+            shm.close()
+        except BufferError:
+            # 处理器仍持有缓冲区引用（例如np.frombuffer），交由进程回收映射
+            pass
+
+
+class ModalityProcessPool:
+    """音频/视觉处理器的进程池执行器"""
+
+    def __init__(
+        self,
+        processor_classes: Dict[str, type],
+        max_workers: int = 2,
+        start_method: str = "spawn"
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers必须大于0")
+
+        self.processor_classes = processor_classes
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "bytes_transferred": 0,
+        }
+        self._inflight = 0
+
+    def supports(self, modality: str) -> bool:
+        """是否由进程池处理该模态"""
+        return self._executor is not None and modality in self.processor_classes
+
+    async def start(self):
+        """创建进程池并预热所有工作进程"""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(self.processor_classes,)
+        )
+
+        # 同时提交与进程数相同的预热任务，迫使每个进程完成模型加载
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _warmup)
+            for _ in range(self.max_workers)
+        ])
+        logger.info("音视频处理进程池已就绪",
+                   workers=self.max_workers,
+                   modalities=list(self.processor_classes))
+
+    async def shutdown(self):
+        """关闭进程池"""
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: executor.shutdown(wait=True, cancel_futures=True)
+        )
+        logger.info("音视频处理进程池已关闭")
+
+    async def analyze(self, modality: str, data) -> Dict[str, Any]:
+        """
+        在工作进程中分析原始字节数据
+
+        数据只拷贝一次到共享内存段，不经过pickle和管道传输
+        """
+        payload = memoryview(data).cast("B")
+        size = payload.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._stats["submitted"] += 1
+        self._stats["bytes_transferred"] += size
+        self._inflight += 1
+        try:
+            shm.buf[:size] = payload
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _run_in_worker, modality, shm.name, size
+            )
+            self._stats["completed"] += 1
+            return result
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._inflight -= 1
+            payload.release()
+            shm.close()
+            shm.unlink()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取进程池统计"""
+        return {
+            **self._stats,
+            "inflight": self._inflight,
+            "max_workers": self.max_workers,
+            "running": self._executor is not None,
+        }
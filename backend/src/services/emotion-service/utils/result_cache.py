@@ -0,0 +1,219 @@
+"""
+Aurora情感分析结果缓存
+进程内LRU + CacheManager远端缓存的两级内容寻址缓存
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import structlog
+
+from ..models.emotion_analyzer import EmotionResult
+
+logger = structlog.get_logger()
+
+
+def _consume_exception(future: asyncio.Future):
+    """避免无人等待的single-flight任务产生未取回异常告警"""
+    if not future.cancelled():
+        future.exception()
+
+
+class EmotionResultCache:
+    """情感分析结果的两级缓存"""
+
+    def __init__(
+        self,
+        cache_manager=None,
+        model_version: str = "1.0.0",
+        max_entries: int = 10000,
+        ttl_seconds: float = 300.0,
+        remote_ttl_seconds: int = 3600,
+        key_prefix: str = "aurora:emotion:result:"
+    ):
+        self.cache_manager = cache_manager
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.remote_ttl = remote_ttl_seconds
+        self.key_prefix = key_prefix
+
+        # key -> (过期时间, 模型版本, 结果)
+        self._entries: "OrderedDict[str, Tuple[float, str, EmotionResult]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "version_invalidations": 0,
+            "remote_errors": 0,
+        }
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """归一化文本：全半角统一、去首尾空白、折叠空白、忽略大小写"""
+        normalized = unicodedata.normalize("NFKC", text)
+        return " ".join(normalized.split()).casefold()
+
+    def make_key(self, text: str, context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        根据文本和完整上下文生成缓存键
+
+        文本处理器和融合引擎都会读取完整上下文（如历史消息内容），
+        因此上下文按键排序后整体参与摘要；携带音频/视觉数据的请求不缓存，返回None
+        """
+        if context and ("audio_data" in context or "visual_data" in context):
+            return None
+
+        key_material = json.dumps(
+            [self.normalize_text(text), context],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{digest}"
+
+    async def get_or_compute(
+        self,
+        text: str,
+        context: Optional[Dict[str, Any]],
+        user_id: Optional[str],
+        compute: Callable[[], Awaitable[EmotionResult]]
+    ) -> EmotionResult:
+        """读取缓存，未命中时计算；同一键的并发请求只计算一次"""
+        key = self.make_key(text, context)
+        if key is None:
+            return await compute()
+
+        result = self._get_local(key)
+        if result is not None:
+            self._stats["l1_hits"] += 1
+            return self._personalize(result, user_id)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            # 计算由独立任务完成，发起请求被取消（如客户端断开）时不影响合并进来的其他请求
+            task = asyncio.ensure_future(self._fill(key, compute))
+            task.add_done_callback(_consume_exception)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._inflight[key] = task
+
+        result = await asyncio.shield(task)
+        return self._personalize(result, user_id)
+
+    async def _fill(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[EmotionResult]]
+    ) -> EmotionResult:
+        """读取远端缓存，未命中时计算并写回两级缓存"""
+        result = await self._get_remote(key)
+        if result is not None:
+            self._stats["l2_hits"] += 1
+        else:
+            self._stats["misses"] += 1
+            result = await compute()
+            if self._is_cacheable(result):
+                await self._set_remote(key, result)
+        if self._is_cacheable(result):
+            self._set_local(key, result)
+        return result
+
+    def _get_local(self, key: str) -> Optional[EmotionResult]:
+        """读取进程内LRU"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, version, result = entry
+        if version != self.model_version:
+            self._stats["version_invalidations"] += 1
+            del self._entries[key]
+            return None
+        if expires_at < time.monotonic():
+            self._stats["expirations"] += 1
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return result
+
+    def _set_local(self, key: str, result: EmotionResult):
+        """写入进程内LRU，超出容量时淘汰最久未使用的条目"""
+        self._entries[key] = (time.monotonic() + self.ttl, self.model_version, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def _get_remote(self, key: str) -> Optional[EmotionResult]:
+        """读取CacheManager远端缓存"""
+        if self.cache_manager is None:
+            return None
+        try:
+            payload = await self.cache_manager.get(key)
+            if not payload:
+                return None
+            data = json.loads(payload)
+            if data.get("model_version") != self.model_version:
+                self._stats["version_invalidations"] += 1
+                return None
+            return EmotionResult.from_dict(data["result"])
+        except Exception as e:
+            self._stats["remote_errors"] += 1
+            logger.error("读取远端结果缓存失败", error=str(e))
+            return None
+
+    async def _set_remote(self, key: str, result: EmotionResult):
+        """写入CacheManager远端缓存"""
+        if self.cache_manager is None:
+            return
+        try:
+            payload = json.dumps(
+                {"model_version": self.model_version, "result": result.to_dict()},
+                ensure_ascii=False,
+                default=str,
+            )
+            await self.cache_manager.set(key, payload, self.remote_ttl)
+        except Exception as e:
+            self._stats["remote_errors"] += 1
+            logger.error("写入远端结果缓存失败", error=str(e))
+
+    @staticmethod
+    def _is_cacheable(result: EmotionResult) -> bool:
+        """有模态超时的降级结果不写入缓存"""
+        return not result.meta("timed_out_modalities")
+
+    @staticmethod
+    def _personalize(result: EmotionResult, user_id: Optional[str]) -> EmotionResult:
+        """为命中的共享结果填入当前用户的元数据"""
+        return result.with_user(user_id)
+
+    def clear(self):
+        """清空进程内缓存"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中、未命中与淘汰计数"""
+        hits = self._stats["l1_hits"] + self._stats["l2_hits"] + self._stats["coalesced"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "model_version": self.model_version,
+        }
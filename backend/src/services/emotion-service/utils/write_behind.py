@@ -0,0 +1,179 @@
+"""
+Aurora批量写回缓冲
+在内存中累积待持久化的记录，按数量或时间阈值批量刷写到数据库
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import structlog
+
+from .metrics import (
+    WRITE_BEHIND_BACKLOG,
+    WRITE_BEHIND_DROPPED,
+    WRITE_BEHIND_FLUSH_FAILURES,
+    WRITE_BEHIND_FLUSH_LATENCY
+)
+
+logger = structlog.get_logger()
+
+
+class WriteBehindBuffer:
+    """有界的批量写回缓冲"""
+
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Any]], Awaitable[None]],
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 20000
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size必须大于0")
+        if max_pending < max_batch_size:
+            raise ValueError("max_pending不能小于max_batch_size")
+
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Deque[Any] = deque()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._closing = False
+        self._closed = False
+        self._worker: Optional[asyncio.Task] = None
+
+        self._backlog_gauge = WRITE_BEHIND_BACKLOG.labels(buffer=name)
+        self._flush_latency = WRITE_BEHIND_FLUSH_LATENCY.labels(buffer=name)
+        self._flush_failures = WRITE_BEHIND_FLUSH_FAILURES.labels(buffer=name)
+        self._dropped = WRITE_BEHIND_DROPPED.labels(buffer=name)
+
+        self._stats = {
+            "enqueued": 0,
+            "flushed_records": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+        }
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    async def start(self):
+        """启动定时刷写任务"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self):
+        """停止定时刷写并把剩余记录全部写出"""
+        if self._worker is not None:
+            # 不取消任务：等待正在进行的刷写完成后由任务自行退出
+            self._closing = True
+            self._wakeup.set()
+            await self._worker
+            self._worker = None
+        await self.flush()
+        self._closed = True
+        if self._pending:
+            logger.error("关闭时仍有记录未能写入", buffer=self.name, backlog=len(self._pending))
+
+    async def add(self, record: Any):
+        """追加一条记录；缓冲已满时先同步刷写以形成背压，关闭后直接同步写入"""
+        if self._closed:
+            await self._write_now(record)
+            return
+
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                # 数据库持续不可用，丢弃最旧的记录以保证内存有界
+                self._pending.popleft()
+                self._drop(1)
+
+        self._pending.append(record)
+        self._stats["enqueued"] += 1
+        self._backlog_gauge.set(len(self._pending))
+        if len(self._pending) >= self.max_batch_size:
+            self._wakeup.set()
+
+    async def _write_now(self, record: Any):
+        """缓冲关闭后到达的记录（如仍在执行的后台任务）单独写入，不再进入缓冲"""
+        try:
+            await self.flush_fn([record])
+            self._stats["flushed_records"] += 1
+        except Exception as e:
+            self._stats["failed_flushes"] += 1
+            self._flush_failures.inc()
+            self._drop(1)
+            logger.error("缓冲关闭后写入记录失败", buffer=self.name, error=str(e))
+
+    async def flush(self):
+        """把当前积压的记录按批写出"""
+        async with self._flush_lock:
+            while self._pending:
+                batch_size = min(self.max_batch_size, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(batch_size)]
+                self._backlog_gauge.set(len(self._pending))
+                started = time.perf_counter()
+                try:
+                    await self.flush_fn(batch)
+                except asyncio.CancelledError:
+                    # 已取出的批次放回队首，留给下一次刷写
+                    self._requeue(batch)
+                    raise
+                except Exception as e:
+                    self._stats["failed_flushes"] += 1
+                    self._flush_failures.inc()
+                    self._requeue(batch)
+                    logger.error("批量写入失败", buffer=self.name,
+                               batchSize=batch_size, error=str(e))
+                    return
+                elapsed = time.perf_counter() - started
+                self._flush_latency.observe(elapsed)
+                elapsed_ms = elapsed * 1000
+                self._stats["flushes"] += 1
+                self._stats["flushed_records"] += batch_size
+                self._last_flush_ms = elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+
+    def _requeue(self, batch: List[Any]):
+        """把写入失败的批次放回队首，超出容量的部分丢弃"""
+        room = self.max_pending - len(self._pending)
+        if room < len(batch):
+            self._drop(len(batch) - max(room, 0))
+            batch = batch[len(batch) - max(room, 0):]
+        self._pending.extendleft(reversed(batch))
+        self._backlog_gauge.set(len(self._pending))
+
+    def _drop(self, count: int):
+        self._stats["dropped"] += count
+        self._dropped.inc(count)
+
+    async def _run(self):
+        """按时间阈值或积压数量触发刷写"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取刷写延迟与积压统计"""
+        flushes = self._stats["flushes"]
+        return {
+            **self._stats,
+            "backlog": len(self._pending),
+            "max_pending": self.max_pending,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / flushes, 3) if flushes else 0.0,
+            "max_flush_ms": round(self._max_flush_ms, 3),
+        }
@@ -5,18 +5,242 @@ Aurora 本地服务器启动脚本
 让用户在自己的网络环境中运行Aurora
 """
 
+import argparse
+import errno
+import gzip
 import http.server
-import socketserver
 import webbrowser
+import select
 import socket
 import os
 import sys
 import json
-from threading import Timer
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from threading import Lock, Timer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 32
+DEFAULT_KEEPALIVE_TIMEOUT = 5.0
+# 等待工作线程的连接数上限，超出时直接返回503
+DEFAULT_MAX_QUEUE = 64
+# 空闲持久连接检查是否有连接排队的间隔（秒）
+IDLE_POLL_INTERVAL = 0.05
+
+REJECT_RESPONSE = (
+    b'HTTP/1.1 503 Service Unavailable\r\n'
+    b'Retry-After: 1\r\n'
+    b'Content-Length: 0\r\n'
+    b'Connection: close\r\n\r\n'
+)
+# 静态资源缓存时间（秒），0表示每次都向服务器验证
+DEFAULT_CACHE_MAX_AGE = 0
+
+# 值得压缩的文本类资源及最小压缩尺寸
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml', 'application/xml', 'text/xml'
+}
+MIN_COMPRESS_SIZE = 1024
+
+# 内存缓存总容量，以及可缓存的单文件大小上限；更大的文件用sendfile零拷贝发送
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_PRELOAD_MAX_SIZE = 1024 * 1024
+
+class AssetCache:
+    """
+    静态资源内存缓存
+    
+    缓存小文件的原始内容及其gzip/brotli压缩版本，按总字节数做LRU淘汰；
+    每次请求比对文件修改时间和大小，文件变化后自动失效
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, max_file_size=DEFAULT_PRELOAD_MAX_SIZE):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+    
+    def cacheable(self, stat):
+        return stat.st_size <= self.max_file_size
+    
+    def get(self, path, stat, encoding=None):
+        """获取文件内容（encoding为None时为原始内容），未命中或已过期时读取并缓存"""
+        key = (path, encoding)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        
+        # 读取和压缩在锁外进行，不阻塞其他文件的请求
+        with open(path, 'rb') as f:
+            data = f.read()
+        if encoding == 'br':
+            body = brotli.compress(data, quality=11)
+        elif encoding == 'gzip':
+            body = gzip.compress(data, compresslevel=9, mtime=0)
+        else:
+            body = data
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            if len(body) <= self.max_bytes:
+                self._entries[key] = (version, body)
+                self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return body
+    
+    def preload(self, directory, skip_dirs=('node_modules', '__pycache__')):
+        """启动时预读站点文件，直到达到缓存容量"""
+        loaded = 0
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in skip_dirs]
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                    if not self.cacheable(stat) or self._size + stat.st_size > self.max_bytes:
+                        continue
+                    self.get(path, stat)
+                    loaded += 1
+                except OSError:
+                    continue
+        return loaded
+
+class MemoryBody:
+    """内存中的响应体"""
+    
+    def __init__(self, data):
+        self.data = data
+    
+    def close(self):
+        pass
+
+class FileBody:
+    """通过sendfile发送的文件区间"""
+    
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.offset = offset
+        self.length = length
+    
+    def close(self):
+        self.file.close()
+
+ASSET_CACHE = AssetCache()
+
+def parse_accept_encoding(header):
+    """解析Accept-Encoding，返回可接受的编码集合（q=0视为不可接受）"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name)
+    return accepted
+
+def parse_range(header, size):
+    """
+    解析单区间的Range请求头
+    
+    返回 (start, end)（闭区间）；无法识别或多区间时返回None（按完整内容响应）；
+    区间无法满足时返回 (None, None)
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # 后缀区间：最后N个字节
+            suffix = int(last)
+            if suffix == 0:
+                return None, None
+            start = max(0, size - suffix)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return None, None
+    if start > end:
+        return None
+    return start, min(end, size - 1)
 
 class AuroraHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """自定义HTTP请求处理器"""
     
+    # 启用HTTP/1.1持久连接，同一设备的多个资源请求复用一个TCP连接
+    protocol_version = 'HTTP/1.1'
+    # 空闲连接的超时时间（秒），避免空闲的持久连接长期占用工作线程
+    timeout = DEFAULT_KEEPALIVE_TIMEOUT
+    # 静态资源的Cache-Control最大缓存时间（秒）
+    cache_max_age = DEFAULT_CACHE_MAX_AGE
+    
+    def handle(self):
+        """处理持久连接上的请求；空闲等待期间若有连接在排队，则关闭本连接让出工作线程"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self._wait_for_next_request():
+                self.close_connection = True
+                break
+            self.handle_one_request()
+    
+    def _wait_for_next_request(self):
+        """等待下一个请求到达；超时或服务器饱和时返回False"""
+        if self._has_buffered_data():
+            return True
+        saturated = getattr(self.server, 'saturated', None)
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        while True:
+            if saturated is not None and saturated():
+                return False
+            wait = IDLE_POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            readable, _, _ = select.select([self.connection], [], [], wait)
+            if readable:
+                return True
+    
+    def _has_buffered_data(self):
+        """不阻塞地检查读缓冲中是否已有下一个请求的数据"""
+        timeout = self.connection.gettimeout()
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(timeout)
+    
     def end_headers(self):
         # 添加CORS头，允许跨域访问
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -28,12 +252,206 @@ class AuroraHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         # 处理根路径重定向到index.html
         if self.path == '/':
             self.path = '/index.html'
-        return super().do_GET()
+        body = self.send_head()
+        if body:
+            try:
+                self._send_body(body)
+            finally:
+                body.close()
+    
+    def _send_body(self, body):
+        """发送响应体：缓存内容直接写出，大文件用sendfile零拷贝发送"""
+        if isinstance(body, MemoryBody):
+            self.wfile.write(body.data)
+        elif isinstance(body, FileBody):
+            self.connection.sendfile(body.file, body.offset, body.length)
+        else:
+            self.copyfile(body, self.wfile)
+    
+    def send_head(self):
+        """
+        发送文件响应头
+        
+        按Accept-Encoding选择压缩版本，支持ETag/Last-Modified条件请求和单区间Range请求；
+        返回MemoryBody/FileBody，由_send_body发送
+        """
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or self.path.split('?', 1)[0].endswith('/'):
+            # 目录重定向和目录列表沿用默认处理
+            return super().send_head()
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        
+        ctype = self.guess_type(path)
+        # Range请求按原始内容响应；压缩版本只缓存在内存中，大文件不压缩
+        byte_range = None
+        if self.headers.get('Range') and self._if_range_matches(stat):
+            byte_range = parse_range(self.headers.get('Range'), stat.st_size)
+        encoding = None
+        if byte_range is None and ASSET_CACHE.cacheable(stat):
+            encoding = self._select_encoding(ctype, stat.st_size)
+        
+        # 强ETag由修改时间和大小生成，不同压缩版本使用不同的ETag
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+        cache_control = 'no-cache' if ctype == 'text/html' or self.cache_max_age <= 0 \
+            else f'public, max-age={self.cache_max_age}'
+        
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            self._send_validators(etag, stat, cache_control, ctype)
+            self.end_headers()
+            return None
+        
+        if byte_range == (None, None):
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{stat.st_size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+        start, end = byte_range or (0, stat.st_size - 1)
+        
+        try:
+            if ASSET_CACHE.cacheable(stat):
+                data = ASSET_CACHE.get(path, stat, encoding)
+                body = MemoryBody(memoryview(data)[start:end + 1] if byte_range else data)
+                length = len(body.data)
+            else:
+                body = FileBody(open(path, 'rb'), start, end - start + 1)
+                length = body.length
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        
+        if byte_range:
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{stat.st_size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self._send_validators(etag, stat, cache_control, ctype)
+        self.end_headers()
+        return body
+    
+    def _select_encoding(self, ctype, size):
+        """选择响应编码：优先brotli，其次gzip，不可压缩或太小的文件不压缩"""
+        if ctype not in COMPRESSIBLE_TYPES or size < MIN_COMPRESS_SIZE:
+            return None
+        accepted = parse_accept_encoding(self.headers.get('Accept-Encoding'))
+        if brotli is not None and 'br' in accepted:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+        return None
+    
+    def _if_range_matches(self, stat):
+        """If-Range与当前文件一致时才按区间响应，否则返回完整内容"""
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if if_range.startswith('"'):
+            return if_range == f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+    
+    def _not_modified(self, etag, mtime):
+        """If-None-Match优先于If-Modified-Since"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in candidates or any(
+                tag[2:] == etag if tag.startswith('W/') else tag == etag
+                for tag in candidates
+            )
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            if since is not None:
+                return int(mtime) <= since.timestamp()
+        return False
+    
+    def _send_validators(self, etag, stat, cache_control, ctype):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Cache-Control', cache_control)
+        if ctype in COMPRESSIBLE_TYPES:
+            self.send_header('Vary', 'Accept-Encoding')
     
     def log_message(self, format, *args):
         # 自定义日志格式
         print(f"[Aurora Server] {format % args}")
 
+class PooledHTTPServer(http.server.HTTPServer):
+    """
+    使用有界线程池并发处理连接的HTTP服务器
+    
+    所有工作线程都被占用且有连接排队时，空闲的持久连接会被关闭以让出线程；
+    排队连接数超过上限时直接返回503
+    """
+    
+    allow_reuse_address = True
+    request_queue_size = 128
+    
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='aurora-http')
+        self._lock = Lock()
+        self._waiting = 0
+        self._busy = 0
+        super().__init__(server_address, handler_class)
+    
+    def saturated(self):
+        """是否有连接在等待空闲的工作线程"""
+        return self._waiting > 0 and self._busy >= self.workers
+    
+    def process_request(self, request, client_address):
+        # 连接交给线程池处理，主线程立即返回继续accept
+        with self._lock:
+            rejected = self._waiting >= self.max_queue
+            if not rejected:
+                self._waiting += 1
+        if rejected:
+            self._reject(request)
+            return
+        self._pool.submit(self._process_request_worker, request, client_address)
+    
+    def _reject(self, request):
+        try:
+            request.settimeout(1.0)
+            request.sendall(REJECT_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def _process_request_worker(self, request, client_address):
+        with self._lock:
+            self._waiting -= 1
+            self._busy += 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._lock:
+                self._busy -= 1
+    
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
 def get_local_ip():
     """获取本机IP地址"""
     try:
@@ -50,7 +468,8 @@ def open_browser(url):
     """延迟打开浏览器"""
     webbrowser.open(url)
 
-def start_server(port=8080):
+def start_server(port=DEFAULT_PORT, workers=DEFAULT_WORKERS, keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+                 cache_max_age=DEFAULT_CACHE_MAX_AGE, preload=True, max_queue=DEFAULT_MAX_QUEUE):
     """启动本地服务器"""
     
     # 获取本机IP
@@ -58,14 +477,22 @@ def start_server(port=8080):
     
     # 创建服务器
     handler = AuroraHTTPRequestHandler
+    handler.timeout = keepalive_timeout
+    handler.cache_max_age = cache_max_age
+    
+    # 预读站点文件到内存缓存
+    if preload:
+        loaded = ASSET_CACHE.preload(os.getcwd())
+        print(f"📦 已预读 {loaded} 个静态文件到内存")
     
     try:
-        with socketserver.TCPServer(("", port), handler) as httpd:
+        with PooledHTTPServer(("", port), handler, workers=workers, max_queue=max_queue) as httpd:
             print("=" * 60)
             print("🌌 Aurora 本地服务器启动成功！")
             print("=" * 60)
             print(f"📱 本机访问: http://localhost:{port}")
             print(f"🌐 局域网访问: http://{local_ip}:{port}")
+            print(f"⚙️  并发工作线程: {workers}")
             print("=" * 60)
             print("📋 使用说明:")
             print("1. 本机访问：在浏览器中打开上面的本机地址")
@@ -80,9 +507,9 @@ def start_server(port=8080):
             httpd.serve_forever()
             
     except OSError as e:
-        if e.errno == 48:  # Address already in use
+        if e.errno == errno.EADDRINUSE:  # Address already in use
             print(f"❌ 端口 {port} 已被占用，尝试使用端口 {port + 1}")
-            start_server(port + 1)
+            start_server(port + 1, workers, keepalive_timeout, cache_max_age, False, max_queue)
         else:
             print(f"❌ 启动服务器失败: {e}")
             sys.exit(1)
@@ -90,7 +517,26 @@ def start_server(port=8080):
         print("\n🛑 服务器已停止")
         sys.exit(0)
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Aurora 本地服务器")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="并发处理连接的工作线程数")
+    parser.add_argument("--keepalive-timeout", type=float, default=DEFAULT_KEEPALIVE_TIMEOUT,
+                        help="持久连接空闲超时（秒）")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help="等待工作线程的连接数上限，超出时返回503")
+    parser.add_argument("--cache-max-age", type=int, default=DEFAULT_CACHE_MAX_AGE,
+                        help="CSS/JS/图片等静态资源的浏览器缓存时间（秒），HTML始终重新验证")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help="静态资源内存缓存容量（MB）")
+    parser.add_argument("--no-preload", action="store_true", help="启动时不预读站点文件")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    
     # 检查Python版本
     if sys.version_info < (3, 6):
         print("❌ 需要Python 3.6或更高版本")
@@ -102,4 +548,6 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # 启动服务器
-    start_server()
+    ASSET_CACHE.max_bytes = args.cache_mb * 1024 * 1024
+    start_server(args.port, args.workers, args.keepalive_timeout, args.cache_max_age,
+                 not args.no_preload, args.max_queue)
@@ -4,147 +4,773 @@ DeepSeek API 代理服务器
 解决浏览器跨域问题
 """
 
-from flask import Flask, request, jsonify
-import requests
-from flask_cors import CORS
+import asyncio
+import hashlib
 import json
 import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from aiohttp import ClientConnectionError, ClientSession, ClientTimeout, TCPConnector, web
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)  # 允许跨域请求
-
 # DeepSeek API 配置
-DEEPSEEK_API_KEY = 'sk-5786e431682e4229a2e63994d4968f15'
-DEEPSEEK_API_URL = 'https://api.deepseek.com/v1/chat/completions'
+DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY', 'sk-5786e431682e4229a2e63994d4968f15')
+# 可指向本地的模拟上游，便于测试
+DEEPSEEK_API_BASE = os.getenv('DEEPSEEK_API_BASE', 'https://api.deepseek.com/v1')
+DEEPSEEK_API_URL = f'{DEEPSEEK_API_BASE}/chat/completions'
+
+# 上游连接池配置
+MAX_CONCURRENCY = int(os.getenv('PROXY_MAX_CONCURRENCY', '256'))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('PROXY_MAX_CONNECTIONS_PER_HOST', '64'))
+KEEPALIVE_TIMEOUT = float(os.getenv('PROXY_KEEPALIVE_TIMEOUT', '60'))
+CHAT_TIMEOUT = float(os.getenv('PROXY_CHAT_TIMEOUT', '30'))
+MODELS_TIMEOUT = float(os.getenv('PROXY_MODELS_TIMEOUT', '10'))
+
+# 对话历史窗口配置（近似token数）
+HISTORY_TOKEN_BUDGET = int(os.getenv('PROXY_HISTORY_TOKEN_BUDGET', '3000'))
+HISTORY_SUMMARY_TOKENS = int(os.getenv('PROXY_HISTORY_SUMMARY_TOKENS', '400'))
+HISTORY_SNIPPET_CHARS = int(os.getenv('PROXY_HISTORY_SNIPPET_CHARS', '60'))
+
+# 响应缓存配置：模型列表缓存默认开启，temperature为0的对话缓存需显式开启
+MODELS_CACHE_TTL = float(os.getenv('PROXY_MODELS_CACHE_TTL', '300'))
+CHAT_CACHE_ENABLED = os.getenv('PROXY_CHAT_CACHE_ENABLED', 'false').lower() == 'true'
+CHAT_CACHE_TTL = float(os.getenv('PROXY_CHAT_CACHE_TTL', '600'))
+CHAT_CACHE_SIZE = int(os.getenv('PROXY_CHAT_CACHE_SIZE', '256'))
+
+# 熔断配置：连续失败达到阈值后快速失败，冷却后放行一个探测请求
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('PROXY_BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv('PROXY_BREAKER_RECOVERY_TIMEOUT', '30'))
+
+# 对冲请求配置：首个请求超过近期p95延迟仍未返回时再发一次，取先返回者
+HEDGE_ENABLED = os.getenv('PROXY_HEDGE_ENABLED', 'false').lower() == 'true'
+HEDGE_DEFAULT_DELAY = float(os.getenv('PROXY_HEDGE_DEFAULT_DELAY', '2.0'))
+HEDGE_MIN_DELAY = float(os.getenv('PROXY_HEDGE_MIN_DELAY', '0.05'))
+HEDGE_MIN_SAMPLES = int(os.getenv('PROXY_HEDGE_MIN_SAMPLES', '20'))
+
+
+def estimate_tokens(text):
+    """近似token数：中日韩字符约1字1个token，其余字符约4个1个token，另加消息开销"""
+    if not text:
+        return 4
+    cjk = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af'
+              or '\uff00' <= ch <= '\uffef')
+    return cjk + math.ceil((len(text) - cjk) / 4) + 4
+
+
+class HistoryWindow:
+    """按token预算裁剪对话历史：最近的轮次原样保留，更早的轮次替换为滚动摘要"""
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET,
+                 summary_tokens=HISTORY_SUMMARY_TOKENS,
+                 snippet_chars=HISTORY_SNIPPET_CHARS,
+                 cache_size=1024):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.snippet_chars = snippet_chars
+        self.cache_size = cache_size
+        # 历史前缀摘要 -> 摘要文本
+        self._summaries = OrderedDict()
+
+    def build_messages(self, system_prompt, history, message):
+        """按时间顺序组装 system → 摘要 → 最近轮次 → 当前用户消息"""
+        turns = [
+            # 字段可能缺失或为null，统一按空字符串处理
+            (entry.get('userMessage') or '', entry.get('auroraResponse') or '')
+            for entry in history or []
+        ]
+        costs = [estimate_tokens(user) + estimate_tokens(reply) for user, reply in turns]
+        budget = self.token_budget - estimate_tokens(system_prompt) - estimate_tokens(message)
+
+        # 放不下全部历史时，为摘要预留空间后从最新一轮往前保留
+        kept = len(turns)
+        if sum(costs) > budget:
+            available = budget - self.summary_tokens
+            kept = 0
+            used = 0
+            for cost in reversed(costs):
+                if used + cost > available:
+                    break
+                used += cost
+                kept += 1
+
+        messages = [{'role': 'system', 'content': system_prompt}]
+
+        older = turns[:len(turns) - kept]
+        if older:
+            messages.append({
+                'role': 'system',
+                'content': f'此前对话摘要：{self._summarize(older)}'
+            })
+
+        for user, reply in turns[len(turns) - kept:]:
+            messages.append({'role': 'user', 'content': user})
+            messages.append({'role': 'assistant', 'content': reply})
+
+        messages.append({'role': 'user', 'content': message})
+        return messages
+
+    def _summarize(self, turns):
+        """生成较早轮次的滚动摘要，复用已缓存的最长前缀摘要"""
+        digests = []
+        digest = b''
+        for user, reply in turns:
+            digest = hashlib.sha1(
+                digest + user.encode('utf-8') + b'\x00' + reply.encode('utf-8')
+            ).digest()
+            digests.append(digest)
+
+        # 找到已缓存的最长前缀
+        start = 0
+        summary = ''
+        for i in range(len(digests) - 1, -1, -1):
+            cached = self._summaries.get(digests[i])
+            if cached is not None:
+                self._summaries.move_to_end(digests[i])
+                start, summary = i + 1, cached
+                break
+
+        # 逐轮追加并裁剪，只保留最近部分以满足摘要预算
+        for i in range(start, len(turns)):
+            user, reply = turns[i]
+            snippet = f'用户：{user[:self.snippet_chars]}；Aurora：{reply[:self.snippet_chars]}'
+            summary = f'{summary} | {snippet}' if summary else snippet
+            while estimate_tokens(summary) > self.summary_tokens and ' | ' in summary:
+                summary = summary.split(' | ', 1)[1]
+            self._remember(digests[i], summary)
+
+        return summary
+
+    def _remember(self, digest, summary):
+        self._summaries[digest] = summary
+        self._summaries.move_to_end(digest)
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+
+
+def canonical_key(*parts):
+    """把请求体规范化（键排序、紧凑分隔）后取摘要，作为去重和缓存的键"""
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """带过期时间和容量上限的LRU缓存"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+
+class SingleFlight:
+    """合并相同键的并发请求：同一时刻只向上游发送一次，其余请求共享结果"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            # 以独立任务执行，发起方断开时不影响其他等待者
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都已离开时取回异常，避免未处理异常告警
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self):
+        return {
+            'inflight': len(self._inflight),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced
+        }
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，请求被快速拒绝"""
+
+    def __init__(self, retry_after):
+        super().__init__('上游服务暂不可用')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """上游熔断器：closed → open → half_open → closed"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=BREAKER_RECOVERY_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.stats = {'opened': 0, 'fast_failed': 0, 'probes': 0}
+
+    def allow(self):
+        """判断是否放行请求；半开状态下同时只放行一个探测请求"""
+        if self.state == 'closed':
+            return True
+        if self.state == 'open':
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                self.stats['fast_failed'] += 1
+                return False
+            self.state = 'half_open'
+            logger.info("熔断器进入半开状态，放行探测请求")
+        if self._probing:
+            self.stats['fast_failed'] += 1
+            return False
+        self._probing = True
+        self.stats['probes'] += 1
+        return True
+
+    def retry_after(self):
+        remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def record_success(self):
+        if self.state != 'closed':
+            logger.info("探测请求成功，熔断器关闭")
+        self.state = 'closed'
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == 'half_open' or self._failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.stats['opened'] += 1
+                logger.error(f"上游连续失败 {self._failures} 次，熔断器打开")
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """探测请求被取消，未得出结论时释放探测名额"""
+        self._probing = False
+
+    def get_stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self._failures,
+            **self.stats
+        }
+
+
+class HedgePolicy:
+    """根据近期成功请求的延迟分布决定对冲等待时间"""
+
+    def __init__(self, default_delay=HEDGE_DEFAULT_DELAY, min_delay=HEDGE_MIN_DELAY,
+                 min_samples=HEDGE_MIN_SAMPLES, window=200):
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self.stats = {'hedged': 0, 'hedge_wins': 0}
+
+    def observe(self, seconds):
+        self._latencies.append(seconds)
+
+    def delay(self):
+        """近期p95延迟；样本不足时使用默认值"""
+        if len(self._latencies) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(self.min_delay, p95)
+
+    def get_stats(self):
+        return {
+            'samples': len(self._latencies),
+            'delay': round(self.delay(), 4),
+            **self.stats
+        }
+
+
+def is_upstream_failure(status):
+    """上游过载或服务端错误计为失败，客户端错误不计"""
+    return status >= 500 or status == 429
+
+
+class UpstreamClient:
+    """复用连接的DeepSeek上游异步客户端"""
+
+    def __init__(self, api_base, api_key, max_concurrency=MAX_CONCURRENCY,
+                 limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, breaker=None, hedge=None):
+        self.api_base = api_base.rstrip('/')
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.breaker = breaker
+        self.hedge = hedge
+        self._session = None
+        self._semaphore = None
+
+    async def start(self):
+        """创建连接池（需在事件循环内调用）"""
+        connector = TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = ClientSession(
+            connector=connector,
+            headers={
+                'Authorization': f'Bearer {self.api_key}',
+                'Content-Type': 'application/json'
+            }
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
 
-@app.route('/health', methods=['GET'])
-def health_check():
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request_json(self, method, path, payload=None, timeout=CHAT_TIMEOUT):
+        """发送请求并返回 (状态码, JSON数据)；经过熔断器，并按需发送对冲请求"""
+        self._check_breaker()
+        try:
+            if self.hedge is not None:
+                status, data = await self._send_hedged(method, path, payload, timeout)
+            else:
+                status, data = await self._send_json(method, path, payload, timeout)
+        except asyncio.CancelledError:
+            if self.breaker is not None:
+                self.breaker.release()
+            raise
+        except BaseException:
+            # 任何其他异常（超时、连接错误、响应解析失败等）都计为失败，保证探测名额被释放
+            self._record(500)
+            raise
+        self._record(status)
+        return status, data
+
+    def _check_breaker(self):
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+
+    def _record(self, status):
+        if self.breaker is None:
+            return
+        if is_upstream_failure(status):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _send_hedged(self, method, path, payload, timeout):
+        """首个请求超过对冲延迟仍未返回时再发一次，取先成功返回者"""
+        first = asyncio.ensure_future(self._send_json(method, path, payload, timeout))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge.delay())
+            if not done:
+                self.hedge.stats['hedged'] += 1
+                tasks.append(asyncio.ensure_future(
+                    self._send_json(method, path, payload, timeout)
+                ))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge.stats['hedge_wins'] += 1
+                        return task.result()
+            # 所有尝试都失败时抛出首个请求的异常
+            raise first.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _send_json(self, method, path, payload, timeout):
+        """发送单次请求并记录成功请求的延迟"""
+        started = time.monotonic()
+        async with self._semaphore:
+            async with self._session.request(
+                method,
+                f'{self.api_base}{path}',
+                json=payload,
+                timeout=ClientTimeout(total=timeout)
+            ) as response:
+                body = await response.read()
+                try:
+                    data = json.loads(body) if body else {}
+                except ValueError:
+                    data = {}
+        if self.hedge is not None and not is_upstream_failure(response.status):
+            self.hedge.observe(time.monotonic() - started)
+        return response.status, data
+
+    @asynccontextmanager
+    async def stream(self, method, path, payload=None, timeout=CHAT_TIMEOUT):
+        """
+        发送流式请求，timeout作为连接和相邻数据块之间的超时
+
+        调用方读取完响应体、退出上下文后才计入熔断：传输途中的上游错误和超时需从上下文中抛出，
+        计为失败；被取消或客户端断开时只释放探测名额
+        """
+        self._check_breaker()
+        try:
+            async with self._semaphore:
+                async with self._session.request(
+                    method,
+                    f'{self.api_base}{path}',
+                    json=payload,
+                    timeout=ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+                ) as response:
+                    yield response
+        except (asyncio.CancelledError, ConnectionResetError):
+            if self.breaker is not None:
+                self.breaker.release()
+            raise
+        except BaseException:
+            self._record(500)
+            raise
+        self._record(response.status)
+
+
+UPSTREAM = web.AppKey('upstream', UpstreamClient)
+HISTORY = web.AppKey('history', HistoryWindow)
+INFLIGHT = web.AppKey('inflight', SingleFlight)
+MODELS_CACHE = web.AppKey('models_cache', TTLCache)
+CHAT_CACHE = web.AppKey('chat_cache', TTLCache)
+
+
+def apply_cors_headers(request, response):
+    """为响应添加跨域头"""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = request.headers.get(
+        'Access-Control-Request-Headers', 'Content-Type'
+    )
+
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """允许跨域请求"""
+    if request.method == 'OPTIONS':
+        response = web.Response()
+    else:
+        response = await handler(request)
+    # 流式响应在开始发送前已自行添加跨域头
+    if not response.prepared:
+        apply_cors_headers(request, response)
+    return response
+
+
+def sse_event(event, data):
+    """编码一条SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+async def health_check(request):
     """健康检查端点"""
-    return jsonify({
+    upstream = request.app[UPSTREAM]
+    return web.json_response({
         'status': 'healthy',
         'message': 'DeepSeek API 代理服务器运行正常',
-        'api_key': DEEPSEEK_API_KEY[:10] + '...'
+        'api_key': DEEPSEEK_API_KEY[:10] + '...',
+        'inflight': request.app[INFLIGHT].get_stats(),
+        'models_cache': request.app[MODELS_CACHE].get_stats(),
+        'chat_cache': request.app[CHAT_CACHE].get_stats() if request.app[CHAT_CACHE] else None,
+        'breaker': upstream.breaker.get_stats(),
+        'hedge': upstream.hedge.get_stats() if upstream.hedge else None
     })
 
-@app.route('/api/deepseek/chat', methods=['POST'])
-def proxy_chat():
+
+async def proxy_chat(request):
     """代理聊天请求"""
+    upstream = request.app[UPSTREAM]
     try:
         # 获取请求数据
-        data = request.json
-        logger.info(f"收到聊天请求: {data.get('message', '')[:50]}...")
-        
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            data = None
+
         # 验证请求数据
         if not data or 'message' not in data:
-            return jsonify({'error': '缺少消息内容'}), 400
-        
-        # 构建DeepSeek API请求
+            return web.json_response({'error': '缺少消息内容'}, status=400)
+
+        logger.info(f"收到聊天请求: {data.get('message', '')[:50]}...")
+
+        # 构建DeepSeek API请求（历史对话按token预算裁剪，并置于当前消息之前）
         deepseek_data = {
             'model': 'deepseek-chat',
-            'messages': [
-                {
-                    'role': 'system',
-                    'content': data.get('system_prompt', '你是一个友好的AI助手。')
-                },
-                {
-                    'role': 'user',
-                    'content': data['message']
-                }
-            ],
+            'messages': request.app[HISTORY].build_messages(
+                data.get('system_prompt', '你是一个友好的AI助手。'),
+                data.get('history'),
+                data['message']
+            ),
             'max_tokens': data.get('max_tokens', 1000),
             'temperature': data.get('temperature', 0.7)
         }
-        
-        # 如果有历史对话，添加到消息中
-        if 'history' in data and data['history']:
-            for entry in data['history']:
-                deepseek_data['messages'].append({
-                    'role': 'user',
-                    'content': entry.get('userMessage', '')
-                })
-                deepseek_data['messages'].append({
-                    'role': 'assistant',
-                    'content': entry.get('auroraResponse', '')
-                })
-        
-        # 发送请求到DeepSeek API
-        response = requests.post(
-            DEEPSEEK_API_URL,
-            headers={
-                'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json=deepseek_data,
-            timeout=30
+        prompt_tokens = sum(estimate_tokens(m['content']) for m in deepseek_data['messages'])
+        logger.info(f"提示消息数: {len(deepseek_data['messages'])}，估算token数: {prompt_tokens}")
+
+        # 流式模式：逐块转发上游输出
+        if data.get('stream'):
+            return await proxy_chat_stream(request, upstream, deepseek_data)
+
+        # temperature为0时输出确定，可直接复用缓存的回复，也可合并并发的相同请求；
+        # 采样回复各不相同，不能在用户之间共享
+        key = canonical_key('POST', '/chat/completions', deepseek_data)
+        chat_cache = request.app[CHAT_CACHE]
+        deterministic = deepseek_data['temperature'] == 0
+        cacheable = chat_cache is not None and deterministic
+        if cacheable:
+            cached = chat_cache.get(key)
+            if cached is not None:
+                logger.info("命中对话缓存")
+                return web.json_response(cached)
+
+        # 发送请求到DeepSeek API（确定性请求并发到达时只发送一次）
+        send = lambda: upstream.request_json(
+            'POST', '/chat/completions', deepseek_data, timeout=CHAT_TIMEOUT
         )
-        
-        logger.info(f"DeepSeek API 响应状态: {response.status_code}")
-        
-        if response.status_code == 200:
-            result = response.json()
+        if deterministic:
+            status, result = await request.app[INFLIGHT].do(key, send)
+        else:
+            status, result = await send()
+
+        logger.info(f"DeepSeek API 响应状态: {status}")
+
+        if status == 200:
             reply = result['choices'][0]['message']['content']
             logger.info(f"成功获取回复: {reply[:50]}...")
-            
-            return jsonify({
+
+            payload = {
                 'success': True,
                 'reply': reply,
                 'usage': result.get('usage', {})
-            })
+            }
+            if cacheable:
+                chat_cache.set(key, payload)
+            return web.json_response(payload)
         else:
-            error_data = response.json() if response.content else {}
-            logger.error(f"DeepSeek API 错误: {error_data}")
-            
-            return jsonify({
+            logger.error(f"DeepSeek API 错误: {result}")
+
+            return web.json_response({
                 'success': False,
-                'error': error_data.get('error', {}).get('message', '未知错误'),
-                'status_code': response.status_code
-            }), response.status_code
-            
-    except requests.exceptions.Timeout:
+                'error': result.get('error', {}).get('message', '未知错误'),
+                'status_code': status
+            }, status=status)
+
+    except CircuitOpenError as e:
+        logger.warning("熔断器打开，快速失败")
+        return web.json_response({
+            'success': False,
+            'error': 'AI服务暂时不可用，请稍后重试'
+        }, status=503, headers={'Retry-After': str(e.retry_after)})
+
+    except asyncio.TimeoutError:
         logger.error("请求超时")
-        return jsonify({
+        return web.json_response({
             'success': False,
             'error': '请求超时，请稍后重试'
-        }), 408
-        
-    except requests.exceptions.ConnectionError:
+        }, status=408)
+
+    except ClientConnectionError:
         logger.error("连接错误")
-        return jsonify({
+        return web.json_response({
             'success': False,
             'error': '网络连接错误，请检查网络'
-        }), 503
-        
+        }, status=503)
+
     except Exception as e:
         logger.error(f"未知错误: {str(e)}")
-        return jsonify({
+        return web.json_response({
             'success': False,
             'error': f'服务器错误: {str(e)}'
-        }), 500
+        }, status=500)
+
+
+async def proxy_chat_stream(request, upstream, deepseek_data):
+    """
+    流式代理聊天请求
+
+    以SSE向客户端转发：若干token事件（回复片段）→ done事件（含usage）；
+    上游在传输途中出错时发送error事件。数据块逐个转发，不在内存中累积回复
+    """
+    deepseek_data = dict(
+        deepseek_data,
+        stream=True,
+        stream_options={'include_usage': True}
+    )
 
-@app.route('/api/deepseek/models', methods=['GET'])
-def get_models():
+    response = None
+    usage = {}
+    try:
+        # 传输途中的上游错误需抛出upstream.stream的上下文，才能计入熔断
+        async with upstream.stream('POST', '/chat/completions', deepseek_data,
+                                   timeout=CHAT_TIMEOUT) as upstream_response:
+            logger.info(f"DeepSeek API 流式响应状态: {upstream_response.status}")
+
+            if upstream_response.status != 200:
+                try:
+                    error_data = await upstream_response.json(content_type=None)
+                except ValueError:
+                    error_data = {}
+                logger.error(f"DeepSeek API 错误: {error_data}")
+                return web.json_response({
+                    'success': False,
+                    'error': (error_data or {}).get('error', {}).get('message', '未知错误'),
+                    'status_code': upstream_response.status
+                }, status=upstream_response.status)
+
+            response = web.StreamResponse(headers={
+                'Content-Type': 'text/event-stream; charset=utf-8',
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            })
+            apply_cors_headers(request, response)
+            await response.prepare(request)
+
+            async for raw_line in upstream_response.content:
+                line = raw_line.strip()
+                if not line.startswith(b'data:'):
+                    continue
+                payload = line[5:].strip()
+                if payload == b'[DONE]':
+                    break
+
+                chunk = json.loads(payload)
+                if chunk.get('usage'):
+                    usage = chunk['usage']
+                for choice in chunk.get('choices') or []:
+                    content = (choice.get('delta') or {}).get('content')
+                    if content:
+                        await response.write(sse_event('token', {'content': content}))
+
+        await response.write(sse_event('done', {'success': True, 'usage': usage}))
+
+    except Exception as e:
+        # 开始发送前的错误交由proxy_chat按普通请求处理
+        if response is None:
+            raise
+        if isinstance(e, ConnectionResetError):
+            logger.info("客户端已断开流式连接")
+            return response
+        logger.error(f"流式转发中断: {str(e)}")
+        error = '请求超时，请稍后重试' if isinstance(e, asyncio.TimeoutError) else f'服务器错误: {str(e)}'
+        await response.write(sse_event('error', {'success': False, 'error': error}))
+
+    await response.write_eof()
+    return response
+
+
+async def get_models(request):
     """获取可用模型列表"""
+    upstream = request.app[UPSTREAM]
+    models_cache = request.app[MODELS_CACHE]
+    cached = models_cache.get('models')
+    if cached is not None:
+        return web.json_response(cached)
+
     try:
-        response = requests.get(
-            'https://api.deepseek.com/v1/models',
-            headers={
-                'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            timeout=10
+        status, result = await request.app[INFLIGHT].do(
+            canonical_key('GET', '/models'),
+            lambda: upstream.request_json('GET', '/models', timeout=MODELS_TIMEOUT)
         )
-        
-        if response.status_code == 200:
-            return jsonify(response.json())
+
+        if status == 200:
+            models_cache.set('models', result)
+            return web.json_response(result)
         else:
-            return jsonify({'error': '获取模型列表失败'}), response.status_code
-            
+            return web.json_response({'error': '获取模型列表失败'}, status=status)
+
+    except CircuitOpenError as e:
+        return web.json_response({'error': str(e)}, status=503,
+                                 headers={'Retry-After': str(e.retry_after)})
+
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return web.json_response({'error': str(e)}, status=500)
+
+
+def create_app(api_base=DEEPSEEK_API_BASE, api_key=DEEPSEEK_API_KEY):
+    """创建代理应用；api_base可指向本地模拟上游"""
+    app = web.Application(middlewares=[cors_middleware])
+    app[UPSTREAM] = UpstreamClient(
+        api_base, api_key,
+        breaker=CircuitBreaker(),
+        hedge=HedgePolicy() if HEDGE_ENABLED else None
+    )
+    app[HISTORY] = HistoryWindow()
+    app[INFLIGHT] = SingleFlight()
+    app[MODELS_CACHE] = TTLCache(max_size=1, ttl=MODELS_CACHE_TTL)
+    app[CHAT_CACHE] = TTLCache(max_size=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL) if CHAT_CACHE_ENABLED else None
+
+    async def on_startup(app):
+        await app[UPSTREAM].start()
+
+    async def on_cleanup(app):
+        await app[UPSTREAM].close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    app.router.add_get('/health', health_check)
+    app.router.add_post('/api/deepseek/chat', proxy_chat)
+    app.router.add_get('/api/deepseek/models', get_models)
+    return app
+
 
 if __name__ == '__main__':
     print("🚀 启动 DeepSeek API 代理服务器...")
@@ -152,11 +778,12 @@ if __name__ == '__main__':
     print("🌐 服务器地址: http://localhost:5000")
     print("📋 可用端点:")
     print("   - GET  /health - 健康检查")
-    print("   - POST /api/deepseek/chat - 聊天代理")
+    print("   - POST /api/deepseek/chat - 聊天代理（stream: true 时以SSE流式返回）")
     print("   - GET  /api/deepseek/models - 模型列表")
     print("\n💡 使用方法:")
-    print("   1. 启动此服务器: python3 proxy_server.py")
-    print("   2. 修改前端代码使用: http://localhost:5000/api/deepseek/chat")
-    print("   3. 或者直接访问: http://localhost:5000/health")
-    
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    print("   1. 安装依赖: pip install aiohttp")
+    print("   2. 启动此服务器: python3 proxy_server.py")
+    print("   3. 修改前端代码使用: http://localhost:5000/api/deepseek/chat")
+    print("   4. 或者直接访问: http://localhost:5000/health")
+
+    web.run_app(create_app(), host='0.0.0.0', port=5000)
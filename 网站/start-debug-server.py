@@ -5,7 +5,6 @@ Aurora对话调试服务器
 """
 
 import http.server
-import socketserver
 import webbrowser
 import os
 import sys
@@ -22,7 +21,8 @@ def start_server(port=8000):
     handler = http.server.SimpleHTTPRequestHandler
     
     try:
-        with socketserver.TCPServer(("", port), handler) as httpd:
+        # 多线程处理连接，调试页面的并行资源请求互不阻塞
+        with http.server.ThreadingHTTPServer(("", port), handler) as httpd:
             print(f"🚀 Aurora调试服务器已启动!")
             print(f"📁 服务目录: {website_dir}")
             print(f"🌐 访问地址: http://localhost:{port}")